@@ -0,0 +1,178 @@
+"""
+Small in-process caches.
+
+TTLCache is a bounded, thread-safe LRU map whose entries also expire after a
+fixed number of seconds. It keeps hit/miss counters so callers can report how
+many database round trips it saves.
+
+dashboard_cache holds serialized GET /dashboard/ responses per user. The
+routes that change a user's meals or workouts invalidate that user's entry;
+the TTL bounds staleness for writes handled by other worker processes. To
+share entries (and invalidations) across workers, replace it with an object
+offering the same get_view/set_view/invalidate/stats methods backed by a
+shared store (e.g. Redis).
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), least recently used first
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _live(self, key: Hashable, now: float) -> Optional[Any]:
+        """
+        The value of a live entry, marked as most recently used; an expired
+        entry is dropped. Caller holds the lock; counters are not touched.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _count(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        The cached value, or None if missing or expired.
+        """
+        with self._lock:
+            value = self._live(key, time.monotonic())
+            self._count(value is not None)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any):
+        # Caller holds the lock
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class DashboardCache(TTLCache):
+    """
+    TTLCache of user_id -> (generation, {view key: JSON body}); one entry per
+    user so a write drops all of that user's cached views at once. Views are
+    read and updated under the cache lock, and hits/misses are counted per
+    view.
+
+    invalidate() replaces the entry with an empty one under a new generation
+    (from one counter, so numbers are never reused even after eviction). A
+    request that missed stores its body only if the generation it saw before
+    querying is still current, so a response built from reads that raced a
+    write is never cached.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, views_per_user: int):
+        super().__init__(max_size, ttl_seconds)
+        self.views_per_user = views_per_user
+        self._generations = itertools.count(1)
+
+    def get_view(self, user_id: int, view: Hashable) -> tuple[Optional[bytes], int]:
+        """
+        (cached body or None, generation to pass to set_view on a miss).
+        """
+        with self._lock:
+            entry = self._live(user_id, time.monotonic())
+            if entry is None:
+                entry = (next(self._generations), {})
+                self._store(user_id, entry)
+            body = entry[1].get(view)
+            self._count(body is not None)
+            return body, entry[0]
+
+    def set_view(self, user_id: int, view: Hashable, body: bytes, generation: int):
+        """
+        Store one view, keeping only the `views_per_user` most recent ones.
+        Skipped if the user's entry was invalidated (or evicted) since
+        get_view returned `generation`.
+        """
+        with self._lock:
+            entry = self._live(user_id, time.monotonic())
+            if entry is None or entry[0] != generation:
+                return
+            views = dict(entry[1])
+            views.pop(view, None)
+            views[view] = body
+            while len(views) > self.views_per_user:
+                views.pop(next(iter(views)))
+            self._store(user_id, (generation, views))
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._store(user_id, (next(self._generations), {}))
+
+
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "1000"))
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+DASHBOARD_CACHE_VIEWS_PER_USER = int(os.getenv("DASHBOARD_CACHE_VIEWS_PER_USER", "2"))
+
+dashboard_cache = DashboardCache(
+    DASHBOARD_CACHE_SIZE, DASHBOARD_CACHE_TTL_SECONDS, DASHBOARD_CACHE_VIEWS_PER_USER
+)
+
+
+def get_cached_dashboard(user_id: int, view: Hashable) -> tuple[Optional[bytes], int]:
+    """
+    (cached body or None, generation). On a miss, read the generation before
+    querying and pass it to cache_dashboard.
+    """
+    return dashboard_cache.get_view(user_id, view)
+
+
+def cache_dashboard(user_id: int, view: Hashable, body: bytes, generation: int):
+    """
+    Store one view (window/page) of the user's dashboard, keeping only the
+    DASHBOARD_CACHE_VIEWS_PER_USER most recent views, unless the user's
+    dashboard was invalidated since `generation` was read.
+    """
+    dashboard_cache.set_view(user_id, view, body, generation)
+
+
+def invalidate_dashboard(user_id: int):
+    dashboard_cache.invalidate(user_id)
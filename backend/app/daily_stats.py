@@ -0,0 +1,168 @@
+"""
+Maintenance of the user_daily_stats rollup.
+
+The write paths keep it current inside their own transaction, one upsert each:
+- complete_log replaces a day's meal items, so that day's nutrition columns are
+  recomputed from the day's meals.
+- create_workout and the CSV import only add sets, so the new workouts'
+  volume is added to their days' counters (concurrent writes add up
+  atomically in the upsert).
+
+rebuild_daily_stats recomputes rows from the raw tables, for the initial
+backfill or after data was changed outside those routes.
+
+Days are UTC dates, matching the meal logger's day bounds.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import Date, and_, cast, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.daily_stats import UserDailyStats
+from models.exercise import Workout, WorkoutSet
+from models.meal import Food, Meal, MealItem
+
+NUTRITION_COLUMNS = ("calories", "protein", "carbs", "fats")
+VOLUME_COLUMNS = ("sets", "reps", "tonnage")
+
+
+def utc_day(ts: datetime) -> date:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).date()
+
+
+def utc_date(column):
+    """
+    SQL expression for the UTC date of a timestamptz column, independent of
+    the session's TimeZone.
+    """
+    return cast(func.timezone("UTC", column), Date)
+
+
+def _nutrition_totals():
+    grams_factor = MealItem.qty / 100
+    return [
+        func.coalesce(func.sum(grams_factor * Food.calories_per_100g), 0).label("calories"),
+        func.coalesce(func.sum(grams_factor * Food.protein_per_100g), 0).label("protein"),
+        func.coalesce(func.sum(grams_factor * Food.carbs_per_100g), 0).label("carbs"),
+        func.coalesce(func.sum(grams_factor * Food.fats_per_100g), 0).label("fats"),
+    ]
+
+
+def _volume_totals():
+    return [
+        func.count(WorkoutSet.id).label("sets"),
+        func.coalesce(func.sum(WorkoutSet.reps), 0).label("reps"),
+        func.coalesce(func.sum(WorkoutSet.reps * WorkoutSet.weight), 0).label("tonnage"),
+    ]
+
+
+def _upsert(source, columns: tuple[str, ...], increment: bool):
+    stmt = pg_insert(UserDailyStats).from_select(["user_id", "day", *columns], source)
+    if increment:
+        set_ = {c: getattr(UserDailyStats, c) + stmt.excluded[c] for c in columns}
+    else:
+        set_ = {c: stmt.excluded[c] for c in columns}
+    set_["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(
+        index_elements=[UserDailyStats.user_id, UserDailyStats.day],
+        set_=set_,
+    )
+
+
+def refresh_day_nutrition(db: Session, user_id: int, day: date):
+    """
+    Recompute the nutrition columns of (user_id, day) from that day's meals.
+    Does not commit.
+    """
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    # An aggregate without GROUP BY always yields one row, so a day whose
+    # items were all removed is reset to 0
+    source = (
+        select(literal(user_id), literal(day, Date), *_nutrition_totals())
+        .select_from(Meal)
+        .join(MealItem, MealItem.meal_id == Meal.id)
+        .join(Food, Food.id == MealItem.food_id)
+        .where(Meal.user_id == user_id, Meal.eaten_at >= start, Meal.eaten_at < end)
+    )
+    db.execute(_upsert(source, NUTRITION_COLUMNS, increment=False))
+
+
+def add_workout_volume(db: Session, workout: Workout):
+    """
+    Add a newly created workout's sets to its day's volume counters.
+    Flushes pending sets; does not commit.
+    """
+    db.flush()
+    source = (
+        select(literal(workout.user_id), literal(utc_day(workout.performed_at), Date), *_volume_totals())
+        .where(WorkoutSet.workout_id == workout.id)
+    )
+    db.execute(_upsert(source, VOLUME_COLUMNS, increment=True))
+
+
+def add_sets_volume(db: Session, set_ids: list[int]):
+    """
+    Add a batch of newly inserted sets (bulk import) to their days' volume
+    counters: one upsert grouped by (user, day). Does not commit.
+    """
+    if not set_ids:
+        return
+    workout_day = utc_date(Workout.performed_at)
+    source = (
+        select(Workout.user_id, workout_day, *_volume_totals())
+        .join(WorkoutSet, WorkoutSet.workout_id == Workout.id)
+        .where(WorkoutSet.id.in_(set_ids))
+        .group_by(Workout.user_id, workout_day)
+    )
+    db.execute(_upsert(source, VOLUME_COLUMNS, increment=True))
+
+
+def rebuild_daily_stats(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Replace the rollup rows (of one user, or everybody) with totals recomputed
+    from meals/meal_items/foods and workouts/workout_sets.
+    Returns the number of rows written. Does not commit.
+    """
+    meal_day = utc_date(Meal.eaten_at)
+    meals_query = (
+        select(Meal.user_id.label("user_id"), meal_day.label("day"), *_nutrition_totals())
+        .join(MealItem, MealItem.meal_id == Meal.id)
+        .join(Food, Food.id == MealItem.food_id)
+        .group_by(Meal.user_id, meal_day)
+    )
+    workout_day = utc_date(Workout.performed_at)
+    workouts_query = (
+        select(Workout.user_id.label("user_id"), workout_day.label("day"), *_volume_totals())
+        .join(WorkoutSet, WorkoutSet.workout_id == Workout.id)
+        .group_by(Workout.user_id, workout_day)
+    )
+    clear = delete(UserDailyStats)
+    if user_id is not None:
+        meals_query = meals_query.where(Meal.user_id == user_id)
+        workouts_query = workouts_query.where(Workout.user_id == user_id)
+        clear = clear.where(UserDailyStats.user_id == user_id)
+
+    m = meals_query.subquery()
+    w = workouts_query.subquery()
+    source = select(
+        func.coalesce(m.c.user_id, w.c.user_id),
+        func.coalesce(m.c.day, w.c.day),
+        *(func.coalesce(m.c[c], 0) for c in NUTRITION_COLUMNS),
+        *(func.coalesce(w.c[c], 0) for c in VOLUME_COLUMNS),
+    ).select_from(
+        m.join(w, and_(m.c.user_id == w.c.user_id, m.c.day == w.c.day), full=True)
+    )
+
+    db.execute(clear)
+    result = db.execute(
+        pg_insert(UserDailyStats).from_select(
+            ["user_id", "day", *NUTRITION_COLUMNS, *VOLUME_COLUMNS], source
+        )
+    )
+    return result.rowcount
@@ -0,0 +1,65 @@
+"""
+Batched resolution of free-text exercise names (workout logging, CSV import).
+
+Names are matched on Exercise.name_normalized (whitespace collapsed,
+case-folded; indexed), so a whole payload is resolved with one IN query and
+the unknown names are created with one multi-row insert.
+"""
+
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.exercise import Exercise, normalize_exercise_name
+
+
+def resolve_exercise_ids(db: Session, names: Iterable[str], known: dict[str, int]) -> int:
+    """
+    Add normalized name -> exercise id to `known` for every name in `names`,
+    creating minimal custom exercises (type "strength", muscle group
+    "Unknown") for names that do not exist yet.
+    Does not commit. Returns the number of exercises created.
+    """
+    # normalized -> name as first written (whitespace collapsed), for new rows
+    wanted: dict[str, str] = {}
+    for name in names:
+        key = normalize_exercise_name(name)
+        if key and key not in known:
+            wanted.setdefault(key, " ".join(name.split()))
+    if not wanted:
+        return 0
+
+    rows = db.execute(
+        select(func.min(Exercise.id), Exercise.name_normalized)
+        .where(Exercise.name_normalized.in_(wanted))
+        .group_by(Exercise.name_normalized)
+    )
+    for exercise_id, key in rows:
+        known[key] = exercise_id
+
+    missing = {key: name for key, name in wanted.items() if key not in known}
+    if not missing:
+        return 0
+    created = db.execute(
+        pg_insert(Exercise)
+        .values([
+            {"name": name, "name_normalized": key, "type": "strength", "muscle_group": "Unknown"}
+            for key, name in missing.items()
+        ])
+        .on_conflict_do_nothing()
+        .returning(Exercise.id, Exercise.name_normalized)
+    ).all()
+    for exercise_id, key in created:
+        known[key] = exercise_id
+
+    # Name taken meanwhile (concurrent insert), or an older row whose
+    # name_normalized was never filled: fall back to the exact name
+    leftover = {name: key for key, name in missing.items() if key not in known}
+    if leftover:
+        for exercise_id, name in db.execute(
+            select(Exercise.id, Exercise.name).where(Exercise.name.in_(leftover))
+        ):
+            known[leftover[name]] = exercise_id
+    return len(created)
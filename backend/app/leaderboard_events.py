@@ -0,0 +1,151 @@
+"""
+Live weekly leaderboard updates over Server-Sent Events.
+
+A single in-process broadcaster fans each leaderboard change out to every
+connected /leaderboard/stream client. The change is computed and serialized
+once by the publisher (complete_challenge, the weekly/manual reset), then the
+same encoded frame is queued for each subscriber, so the per-event cost does
+not depend on what the clients display.
+
+Each subscriber has a small bounded queue. A client that falls behind does not
+hold events or memory for everybody else: its backlog is dropped and replaced
+by a single "resync" event, telling it to refetch the leaderboard.
+
+publish() may be called from any thread (sync routes run in the threadpool,
+resets in the scheduler thread); delivery always happens on the event loop.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import Optional
+
+LEADERBOARD_STREAM_QUEUE_SIZE = int(os.getenv("LEADERBOARD_STREAM_QUEUE_SIZE", "16"))
+LEADERBOARD_STREAM_HEARTBEAT_SECONDS = float(os.getenv("LEADERBOARD_STREAM_HEARTBEAT_SECONDS", "15"))
+LEADERBOARD_STREAM_MAX_SUBSCRIBERS = int(os.getenv("LEADERBOARD_STREAM_MAX_SUBSCRIBERS", "10000"))
+
+
+def _frame(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+RESYNC_FRAME = _frame("resync", {})
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+class LeaderboardBroadcaster:
+    def __init__(self, queue_size: int = LEADERBOARD_STREAM_QUEUE_SIZE):
+        self._queue_size = queue_size
+        self._subscribers: set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[asyncio.Task] = None
+        # Counters for monitoring and load tests
+        self.published = 0
+        self.resyncs = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Register a new subscriber. Must be called on the event loop.
+        """
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = self._loop.create_task(self._send_heartbeats())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict):
+        """
+        Encode the event once and hand it to the event loop for fan-out.
+        A no-op while nobody is subscribed.
+        """
+        with self._lock:
+            loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+        frame = _frame(event, data)
+        try:
+            loop.call_soon_threadsafe(self._fan_out, frame)
+        except RuntimeError:
+            # Loop shut down between the check and the call
+            pass
+
+    def _fan_out(self, frame: bytes):
+        self.published += 1
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Slow client: drop its backlog and ask it to refetch instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC_FRAME)
+                self.resyncs += 1
+
+    async def _send_heartbeats(self):
+        """
+        One timer for all subscribers: a comment line every
+        LEADERBOARD_STREAM_HEARTBEAT_SECONDS so proxies keep idle streams open.
+        Stops once nobody is subscribed.
+        """
+        while self._subscribers:
+            await asyncio.sleep(LEADERBOARD_STREAM_HEARTBEAT_SECONDS)
+            for queue in list(self._subscribers):
+                if not queue.full():
+                    queue.put_nowait(HEARTBEAT_FRAME)
+
+    async def stream(self):
+        """
+        Subscribe and yield this client's SSE frames until it goes away.
+        """
+        queue = self.subscribe()
+        try:
+            # Sent first so a (re)connecting client refetches what it missed
+            yield RESYNC_FRAME
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
+
+
+leaderboard_broadcaster = LeaderboardBroadcaster()
+
+
+def publish_rank_change(
+    username: str,
+    weekly_xp: int,
+    previous_rank: Optional[int],
+    rank: int,
+    version: int,
+):
+    """
+    One user's new standing. Everybody ranked in [rank, previous_rank) moves
+    down one place (everybody from `rank` on when previous_rank is None).
+    """
+    leaderboard_broadcaster.publish(
+        "rank_change",
+        {
+            "username": username,
+            "weekly_xp": weekly_xp,
+            "previous_rank": previous_rank,
+            "rank": rank,
+            "version": version,
+        },
+    )
+
+
+def publish_resync():
+    """
+    The standings changed wholesale (reset, reload): clients should refetch.
+    """
+    leaderboard_broadcaster.publish("resync", {})
@@ -0,0 +1,230 @@
+"""
+In-process weekly leaderboard index.
+
+Keeps every user's (-weekly_xp, id) key for the current week in a sorted list,
+so rank, top-N and "around me" lookups are bisects and slices instead of SQL
+sorts. The index is loaded at startup from user_weekly_xp, kept hot by
+complete_challenge / registration / the weekly reset, and periodically compared
+against the database by the scheduler. While it is cold (not loaded yet,
+dropped after a failed check, or still holding last week) the leaderboard
+routes fall back to their SQL queries.
+
+Every change to the index also bumps a monotonically increasing version, which
+the routes expose as an ETag so unchanged polls get a 304 without touching the
+database.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db.session import SessionLocal
+from models.user import User
+from models.leaderboard import UserWeeklyXP
+from app.scheduler import current_week_start
+from app.leaderboard_events import publish_resync
+
+
+class RankedUser(NamedTuple):
+    rank: int
+    user_id: int
+    username: str
+    weekly_xp: int
+
+
+class LeaderboardIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Sorted (-weekly_xp, user_id) keys: list position + 1 is the rank
+        self._keys: list[tuple[int, int]] = []
+        # user_id -> (username, weekly_xp)
+        self._users: dict[int, tuple[str, int]] = {}
+        # Leaderboard week the index holds; a stale week counts as cold
+        self._week: date | None = None
+        self._warm = False
+        # Bumped on every change to the standings (awards, new users, resets, reloads)
+        self._version = 0
+
+    @property
+    def is_warm(self) -> bool:
+        return self._warm and self._week == current_week_start()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def load(self, db: Session) -> int:
+        """
+        (Re)build the index for the current week. Returns the number of users.
+        """
+        week_start = current_week_start()
+        rows = (
+            db.query(User.id, User.username, UserWeeklyXP.xp)
+            .outerjoin(
+                UserWeeklyXP,
+                (UserWeeklyXP.user_id == User.id) & (UserWeeklyXP.week_start == week_start),
+            )
+            .all()
+        )
+
+        users = {row.id: (row.username, row.xp or 0) for row in rows}
+        keys = sorted((-xp, user_id) for user_id, (_name, xp) in users.items())
+
+        with self._lock:
+            self._users = users
+            self._keys = keys
+            self._week = week_start
+            self._warm = True
+            self._version += 1
+        return len(users)
+
+    def invalidate(self):
+        """
+        Mark the index cold so reads go back to SQL until the next load().
+        """
+        with self._lock:
+            self._warm = False
+            self._version += 1
+
+    def set_user(self, user_id: int, username: str, weekly_xp: int) -> tuple[Optional[int], int]:
+        """
+        Insert a user or move them to their new weekly_xp position.
+        Returns (previous_rank, new_rank); previous_rank is None for a new user.
+        """
+        weekly_xp = weekly_xp or 0
+        with self._lock:
+            previous_rank = None
+            previous = self._users.get(user_id)
+            if previous is not None:
+                old_key = (-previous[1], user_id)
+                pos = bisect_left(self._keys, old_key)
+                if pos < len(self._keys) and self._keys[pos] == old_key:
+                    del self._keys[pos]
+                    previous_rank = pos + 1
+            self._users[user_id] = (username, weekly_xp)
+            new_key = (-weekly_xp, user_id)
+            pos = bisect_left(self._keys, new_key)
+            self._keys.insert(pos, new_key)
+            self._version += 1
+            return previous_rank, pos + 1
+
+    def reset(self, week_start: date):
+        """
+        New week: everybody back to 0 XP, which leaves them ordered by id.
+        """
+        with self._lock:
+            self._users = {user_id: (name, 0) for user_id, (name, _xp) in self._users.items()}
+            self._keys = [(0, user_id) for user_id in sorted(self._users)]
+            self._week = week_start
+            self._version += 1
+
+    def _row(self, pos: int) -> RankedUser:
+        neg_xp, user_id = self._keys[pos]
+        return RankedUser(pos + 1, user_id, self._users[user_id][0], -neg_xp)
+
+    def get(self, user_id: int) -> Optional[RankedUser]:
+        """
+        The user's rank and weekly_xp, or None if they are not indexed.
+        """
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            pos = bisect_left(self._keys, (-entry[1], user_id))
+            return self._row(pos)
+
+    def page(
+        self,
+        limit: int,
+        after: Optional[tuple[int, int]] = None,
+    ) -> tuple[list[RankedUser], bool]:
+        """
+        Up to `limit` users after the (weekly_xp, user_id) cursor, plus
+        whether more users follow.
+        """
+        with self._lock:
+            start = 0
+            if after is not None:
+                after_xp, after_id = after
+                start = bisect_right(self._keys, (-after_xp, after_id))
+            end = min(start + limit, len(self._keys))
+            rows = [self._row(pos) for pos in range(start, end)]
+            return rows, end < len(self._keys)
+
+    def weekly_xp_values(self) -> list[int]:
+        """
+        Every user's weekly_xp in rank order (highest first).
+        """
+        with self._lock:
+            return [-neg_xp for neg_xp, _user_id in self._keys]
+
+    def around(self, user_id: int, k: int) -> Optional[list[RankedUser]]:
+        """
+        The k users above and below `user_id` with the user in the middle,
+        or None if the user is not indexed.
+        """
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            pos = bisect_left(self._keys, (-entry[1], user_id))
+            start = max(pos - k, 0)
+            end = min(pos + k + 1, len(self._keys))
+            return [self._row(p) for p in range(start, end)]
+
+    def matches_db(self, db: Session) -> bool:
+        """
+        Cheap consistency check: user count and the current week's XP total
+        must agree with the database.
+        """
+        count = db.query(func.count(User.id)).scalar()
+        total = (
+            db.query(func.coalesce(func.sum(UserWeeklyXP.xp), 0))
+            .filter(UserWeeklyXP.week_start == self._week)
+            .scalar()
+        )
+
+        with self._lock:
+            index_total = sum(xp for _name, xp in self._users.values())
+            return count == len(self._users) and int(total) == index_total
+
+
+leaderboard_index = LeaderboardIndex()
+
+
+def load_leaderboard_index():
+    """
+    Warm the index from the database. Called at application startup.
+    """
+    db = SessionLocal()
+    try:
+        count = leaderboard_index.load(db)
+        print(f"[{datetime.now(timezone.utc)}] Leaderboard index loaded with {count} users.")
+    except Exception as e:
+        leaderboard_index.invalidate()
+        print(f"[{datetime.now(timezone.utc)}] ERROR loading leaderboard index: {e}")
+    finally:
+        db.close()
+
+
+def check_leaderboard_index():
+    """
+    Compare the index against the database and rebuild it on drift (e.g. XP
+    awarded by another worker process). Scheduled periodically.
+    """
+    db = SessionLocal()
+    try:
+        if leaderboard_index.is_warm and leaderboard_index.matches_db(db):
+            return
+        print(f"[{datetime.now(timezone.utc)}] Leaderboard index out of sync with database. Reloading.")
+        leaderboard_index.load(db)
+        publish_resync()
+    except Exception as e:
+        leaderboard_index.invalidate()
+        print(f"[{datetime.now(timezone.utc)}] ERROR checking leaderboard index: {e}")
+    finally:
+        db.close()
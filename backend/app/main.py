@@ -7,8 +7,10 @@ import traceback
 
 from db import Base, engine
 from models import *
-from .routers import dashboard, auth, nutrition, leaderboard, challenges, exercises, workouts, meal_logger, workout_bests, questionnaire, admin
-from .scheduler import start_scheduler, shutdown_scheduler
+from .routers import dashboard, auth, nutrition, leaderboard, challenges, exercises, workouts, meal_logger, workout_bests, questionnaire, admin, export
+from .scheduler import start_scheduler, shutdown_scheduler, carry_over_legacy_weekly_xp
+from .leaderboard_index import load_leaderboard_index
+from auth import shutdown_password_pool, load_token_versions
 
 load_dotenv()
 
@@ -22,15 +24,22 @@ scheduler = None
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the weekly leaderboard reset scheduler"""
+    """Initialize the weekly leaderboard reset scheduler, warm the leaderboard index and load token versions"""
     global scheduler
+    try:
+        carry_over_legacy_weekly_xp()
+    except Exception as e:
+        print(f"[Startup] Legacy weekly XP carry-over failed: {e}")
     scheduler = start_scheduler()
+    load_leaderboard_index()
+    load_token_versions()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Gracefully shutdown the scheduler"""
+    """Gracefully shutdown the scheduler and the password hashing pool"""
     global scheduler
     shutdown_scheduler(scheduler)
+    shutdown_password_pool()
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -89,3 +98,6 @@ app.include_router(questionnaire.router)
 
 # Admin router
 app.include_router(admin.router)
+
+# Export router
+app.include_router(export.router)
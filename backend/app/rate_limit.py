@@ -0,0 +1,125 @@
+"""
+Sliding-window rate limiting.
+
+A SlidingWindowLimiter allows at most `limit` hits per key within any
+`window_seconds` span. The hit timestamps live in a RateLimitBackend: the
+default MemoryRateLimitBackend keeps them in this process; a shared
+implementation (e.g. Redis sorted sets) can be assigned to `limiter.backend`
+to enforce the limit across worker processes.
+
+Used by /api/auth/login to throttle attempts per username and per client IP
+before any password is verified.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+LOGIN_RATE_LIMIT_USERNAME_ATTEMPTS = int(os.getenv("LOGIN_RATE_LIMIT_USERNAME_ATTEMPTS", "5"))
+LOGIN_RATE_LIMIT_USERNAME_WINDOW_SECONDS = float(os.getenv("LOGIN_RATE_LIMIT_USERNAME_WINDOW_SECONDS", "300"))
+LOGIN_RATE_LIMIT_IP_ATTEMPTS = int(os.getenv("LOGIN_RATE_LIMIT_IP_ATTEMPTS", "20"))
+LOGIN_RATE_LIMIT_IP_WINDOW_SECONDS = float(os.getenv("LOGIN_RATE_LIMIT_IP_WINDOW_SECONDS", "60"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class RateLimitBackend:
+    """
+    Storage for per-key hit timestamps.
+    """
+
+    def hit(self, key: str, limit: int, window_seconds: float, now: float) -> float:
+        """
+        Record a hit for `key` unless it already has `limit` hits in the last
+        `window_seconds`. Returns 0 if the hit was recorded, else the seconds
+        until the oldest hit leaves the window.
+        """
+        raise NotImplementedError
+
+    def reset(self, key: str):
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    In-process backend: one deque of timestamps per key, with the least
+    recently hit keys evicted beyond `max_keys`.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._hits: "OrderedDict[str, deque[float]]" = OrderedDict()
+
+    def hit(self, key: str, limit: int, window_seconds: float, now: float) -> float:
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            else:
+                self._hits.move_to_end(key)
+
+            cutoff = now - window_seconds
+            while hits and hits[0] <= cutoff:
+                hits.popleft()
+
+            if len(hits) >= limit:
+                return hits[0] - cutoff
+
+            hits.append(now)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+            return 0.0
+
+    def reset(self, key: str):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+class SlidingWindowLimiter:
+    def __init__(self, name: str, limit: int, window_seconds: float, backend: RateLimitBackend):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.backend = backend
+        # Metrics
+        self.allowed = 0
+        self.rejected = 0
+
+    def hit(self, key: str) -> float:
+        """
+        Count one attempt for `key`. Returns 0 if allowed, else Retry-After seconds.
+        """
+        retry_after = self.backend.hit(f"{self.name}:{key}", self.limit, self.window_seconds, time.time())
+        if retry_after:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    def reset(self, key: str):
+        self.backend.reset(f"{self.name}:{key}")
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "window_seconds": self.window_seconds,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+_memory_backend = MemoryRateLimitBackend()
+
+login_username_limiter = SlidingWindowLimiter(
+    "login:username",
+    LOGIN_RATE_LIMIT_USERNAME_ATTEMPTS,
+    LOGIN_RATE_LIMIT_USERNAME_WINDOW_SECONDS,
+    _memory_backend,
+)
+login_ip_limiter = SlidingWindowLimiter(
+    "login:ip",
+    LOGIN_RATE_LIMIT_IP_ATTEMPTS,
+    LOGIN_RATE_LIMIT_IP_WINDOW_SECONDS,
+    _memory_backend,
+)
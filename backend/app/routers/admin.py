@@ -3,63 +3,44 @@ Admin endpoints for manual operations like resetting the leaderboard.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
 
-from db.session import SessionLocal
 from models.user import User
-from auth import get_current_user
-from app.scheduler import reset_weekly_leaderboard, get_last_reset_date
+from auth import get_current_user, user_cache
+from app.scheduler import run_leaderboard_reset, get_last_reset_date
+from app.cache import dashboard_cache
+from app.rate_limit import login_ip_limiter, login_username_limiter
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/reset-leaderboard")
 def manual_reset_leaderboard(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
     """
     Manually trigger a weekly leaderboard reset.
-    This will reset all users' weekly_xp to 0 and record the reset.
-    
+    This clears the current week's user_weekly_xp rows (everybody back to 0
+    for this week) and records the reset. Earlier weeks are kept.
+
+    Runs the shared batched reset (resuming an interrupted manual reset if
+    there is one) and returns its progress stats.
+
     Note: This bypasses the weekly check and forces a reset.
     """
     try:
-        # Force reset by temporarily modifying the function
-        from app.scheduler import reset_weekly_leaderboard as original_reset
-        from datetime import datetime, timezone
-        from sqlalchemy import update
-        from models.user import User
-        from app.scheduler import LeaderboardReset
-        
-        # Perform the reset
-        result = db.execute(update(User).values(weekly_xp=0))
-        
-        # Record this reset
-        reset_record = LeaderboardReset()
-        db.add(reset_record)
-        db.commit()
-        
-        return {
-            "message": "Leaderboard reset successfully",
-            "users_reset": result.rowcount,
-            "reset_at": datetime.now(timezone.utc).isoformat(),
-        }
+        stats = run_leaderboard_reset("manual")
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to reset leaderboard: {str(e)}"
         )
 
+    return {
+        "message": "Leaderboard reset successfully",
+        "users_reset": stats["rows"],
+        **stats,
+    }
+
 
 @router.get("/last-reset")
 def get_last_reset(current_user: User = Depends(get_current_user)):
@@ -70,4 +51,29 @@ def get_last_reset(current_user: User = Depends(get_current_user)):
     
     return {
         "last_reset": last_reset.isoformat() if last_reset else None,
-    }
\ No newline at end of file
+    }
+
+@router.get("/cache-stats")
+def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """
+    Hit/miss counters of the in-process caches.
+
+    - user: get_current_user's user snapshots (each hit is a users query saved).
+    - dashboard: serialized GET /dashboard/ responses, per user (each hit is
+      the whole dashboard query set saved).
+    """
+    return {
+        "user": user_cache.stats(),
+        "dashboard": dashboard_cache.stats(),
+    }
+
+
+@router.get("/rate-limit-stats")
+def get_rate_limit_stats(current_user: User = Depends(get_current_user)):
+    """
+    Allowed/rejected login attempts per limiter since startup (this process).
+    """
+    return {
+        "login_username": login_username_limiter.stats(),
+        "login_ip": login_ip_limiter.stats(),
+    }
@@ -1,79 +1,113 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from db.database import SessionLocal
+from db.database import get_db
 from models.user import User
-from models.leaderboard import LeaderboardEntry
 from schemas.auth import UserRegister, UserLogin, Token, UserResponse
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from auth import (
+    hash_password_async,
+    verify_password_async,
+    create_user_access_token,
+    get_current_user,
+    invalidate_cached_user,
+    revoke_user_tokens,
+)
+from app.leaderboard_index import leaderboard_index
+from app.rate_limit import login_ip_limiter, login_username_limiter
 
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
-def get_db():
-    db = SessionLocal()
+def _create_user(db: Session, user_data: UserRegister, password_hash: str):
+    """
+    Insert the user in one statement and let the unique indexes on username
+    and email reject duplicates (no pre-check SELECTs).
+    Returns the new row's id, username and token_version.
+    """
     try:
-        yield db
-    finally:
-        db.close()
-
-
-@router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
-    # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
+        new_user = db.execute(
+            insert(User)
+            .values(
+                username=user_data.username,
+                email=user_data.email,
+                password_hash=password_hash,
+                age=user_data.age,
+                height=user_data.height,
+                weight=user_data.weight,
+            )
+            .returning(User.id, User.username, User.token_version)
+        ).one()
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        constraint = getattr(getattr(e.orig, "diag", None), "constraint_name", None) or ""
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
+            detail="Email already registered" if "email" in constraint else "Username already registered"
         )
+    return new_user
 
-    # Check if email already exists
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
-    if existing_email:
+
+def _find_login_user(db: Session, username: str):
+    # Find user by username or email
+    user = db.query(User.id, User.username, User.password_hash, User.token_version).filter(
+        (User.username == username) | (User.email == username)
+    ).first()
+
+    # End the read transaction: the connection goes back to the pool while
+    # the password is verified
+    db.commit()
+    return user
+
+
+def _throttle_login(username_key: str, client_ip: str | None):
+    """
+    Count this attempt against the per-IP and per-username sliding windows and
+    reject it with 429 if either is full, before any query or bcrypt work.
+    """
+    retry_after = login_ip_limiter.hit(client_ip) if client_ip else 0.0
+    if not retry_after:
+        retry_after = login_username_limiter.hit(username_key)
+    if retry_after:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
         )
 
+
+# register/login are async so bcrypt runs in the password process pool
+# (auth.hash_password_async / verify_password_async) without holding a
+# threadpool slot; their queries still run in the threadpool.
+
+@router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     # Create new user
-    new_user = User(
-        username=user_data.username,
-        email=user_data.email,
-        password_hash=hash_password(user_data.password),
-        age=user_data.age,
-        height=user_data.height,
-        weight=user_data.weight,
-    )
-
-    db.add(new_user)
-    db.flush()  # gets new_user.id without committing yet
-
-    leaderboard_entry = LeaderboardEntry(
-        user_id=new_user.id,
-        weekly_points=0
-    )
-    db.add(leaderboard_entry)
-    db.commit()
-    db.refresh(new_user)
+    password_hash = await hash_password_async(user_data.password)
+    new_user = await run_in_threadpool(_create_user, db, user_data, password_hash)
+    invalidate_cached_user(new_user.id)
+    # New users start the week at 0 XP
+    leaderboard_index.set_user(new_user.id, new_user.username, 0)
 
     # Create access token
-    access_token = create_access_token(data={"sub": str(new_user.id)})
+    access_token = create_user_access_token(new_user)
 
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(request: Request, credentials: UserLogin, db: Session = Depends(get_db)):
     try:
-        print(f"DEBUG: Login attempt for username: {credentials.username}")
-        # Find user by username or email
-        user = db.query(User).filter(
-            (User.username == credentials.username) | (User.email == credentials.username)
-        ).first()
+        username_key = credentials.username.strip().lower()
+        _throttle_login(username_key, request.client.host if request.client else None)
 
-        print(f"DEBUG: User found: {user}")
+        user = await run_in_threadpool(_find_login_user, db, credentials.username)
 
         if not user:
             raise HTTPException(
@@ -83,20 +117,23 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
             )
 
         # Verify password
-        print(f"DEBUG: Verifying password")
-        if not verify_password(credentials.password, user.password_hash):
+        if not await verify_password_async(credentials.password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid username or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        # A successful login clears the username's failed attempts
+        login_username_limiter.reset(username_key)
+
         # Create access token
-        print(f"DEBUG: Creating token")
-        access_token = create_access_token(data={"sub": str(user.id)})
+        access_token = create_user_access_token(user)
 
-        print(f"DEBUG: Returning token")
         return {"access_token": access_token, "token_type": "bearer"}
+    except HTTPException:
+        # 401/429/503 are expected outcomes; don't spend a traceback on each
+        raise
     except Exception as e:
         print(f"ERROR in login: {e}")
         import traceback
@@ -104,6 +141,18 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
         raise
 
 
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+def logout_all(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Revoke every token issued to the current user (all devices), including
+    the one used for this request.
+    """
+    revoke_user_tokens(db, current_user.id)
+
+
 @router.get("/me", response_model=UserResponse)
 def get_me(current_user: User = Depends(get_current_user)):
     return current_user
@@ -3,28 +3,26 @@ from datetime import datetime, timezone, date, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, cast, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from db.session import SessionLocal
+from db.database import get_db
 from models.challenge import Challenge, UserChallenge
 from models.user import User
+from models.leaderboard import UserWeeklyXP
 from schemas.challenges import (
     ChallengeResponse,
     UserChallengeResponse,
     ChallengeStatus,
     DashboardChallengesResponse,
 )
-from auth import get_current_user
+from auth import TokenPrincipal, get_current_user, get_token_principal, invalidate_cached_user
+from app.leaderboard_index import leaderboard_index
+from app.leaderboard_events import publish_rank_change, publish_resync
+from app.scheduler import current_week_start
 
 
 router = APIRouter(prefix="/api/challenges", tags=["challenges"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def _to_status(
     challenge: Challenge,
     user_challenge: UserChallenge | None,
@@ -109,7 +107,7 @@ def get_all_challenges(db: Session = Depends(get_db)):
 
 @router.get("/user", response_model=list[UserChallengeResponse])
 def get_user_challenges(
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     db: Session = Depends(get_db),
 ):
     """
@@ -143,7 +141,7 @@ def get_user_challenges(
 
 @router.get("/user/dashboard", response_model=DashboardChallengesResponse)
 def get_user_dashboard_challenges(
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     db: Session = Depends(get_db),
 ):
     """
@@ -308,7 +306,8 @@ def complete_challenge(
     - Ensures the challenge exists.
     - Creates a UserChallenge row if it doesn't exist yet.
     - Sets completed_at (if not already set).
-    - Adds challenge.points to user's weekly_xp and total_xp.
+    - Adds challenge.points to user's total_xp and to this week's
+      user_weekly_xp row (created on the first award of the week).
     """
     # 1) Ensure the global challenge exists
     challenge = db.query(Challenge).filter(Challenge.id == challenge_id).first()
@@ -318,13 +317,9 @@ def complete_challenge(
             detail="Challenge not found",
         )
 
-    # 2) Load a FRESH User object bound to THIS session
-    db_user = db.query(User).filter(User.id == current_user.id).first()
-    if not db_user:
-        raise HTTPException(
-            status_code=404,
-            detail="User not found",
-        )
+    # 2) current_user is already bound to THIS session (get_current_user
+    #    shares the request's get_db session), so no re-query is needed
+    db_user = current_user
 
     # 3) Get or create UserChallenge row
     uc = db.query(UserChallenge).filter(
@@ -357,9 +352,17 @@ def complete_challenge(
             already_completed_in_period = (completed_date >= week_start)
     
     if already_completed_in_period:
+        weekly_xp = (
+            db.query(UserWeeklyXP.xp)
+            .filter(
+                UserWeeklyXP.user_id == db_user.id,
+                UserWeeklyXP.week_start == current_week_start(),
+            )
+            .scalar()
+        )
         return {
             "completed": True,
-            "weekly_xp": db_user.weekly_xp,
+            "weekly_xp": weekly_xp or 0,
             "total_xp": db_user.total_xp,
             "streak": db_user.streak,
         }
@@ -396,24 +399,43 @@ def complete_challenge(
     # 6) Mark as completed
     uc.completed_at = now
 
-    # 7) Award XP
+    # 7) Award XP: total_xp on the user (incremented in SQL, as current_user
+    #    may come from the user cache), weekly XP as an atomic upsert into
+    #    this week's ledger row
     points = challenge.points or 0
-    db_user.weekly_xp = (db_user.weekly_xp or 0) + points
-    db_user.total_xp = (db_user.total_xp or 0) + points
+    db_user.total_xp = User.total_xp + points
+    weekly_xp = db.execute(
+        pg_insert(UserWeeklyXP)
+        .values(user_id=db_user.id, week_start=current_week_start(), xp=points)
+        .on_conflict_do_update(
+            index_elements=[UserWeeklyXP.user_id, UserWeeklyXP.week_start],
+            set_={"xp": UserWeeklyXP.xp + points, "updated_at": func.now()},
+        )
+        .returning(UserWeeklyXP.xp)
+    ).scalar_one()
     
     # 8) Increment streak only once per day and update last completion time
     if should_increment_streak:
         db_user.streak = (db_user.streak or 0) + 1
     db_user.last_challenge_completed_at = now
 
-    # 9) Save + refresh ONLY db_user and uc (NOT current_user)
+    # 9) Save + refresh db_user and uc
     db.commit()
     db.refresh(uc)
     db.refresh(db_user)
+    invalidate_cached_user(db_user.id)
+
+    # 10) Move the user in the in-process leaderboard index and push the
+    #     change to live leaderboard subscribers
+    previous_rank, rank = leaderboard_index.set_user(db_user.id, db_user.username, weekly_xp)
+    if leaderboard_index.is_warm:
+        publish_rank_change(db_user.username, weekly_xp, previous_rank, rank, leaderboard_index.version)
+    else:
+        publish_resync()
 
     return {
         "completed": True,
-        "weekly_xp": db_user.weekly_xp,
+        "weekly_xp": weekly_xp,
         "total_xp": db_user.total_xp,
         "streak": db_user.streak,
     }
@@ -1,5 +1,11 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import base64
+import json
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.orm import Session, selectinload
 
 from db import get_db
 from models import (
@@ -9,108 +15,402 @@ from models import (
     Workout,
     WorkoutSet,
     Exercise,
-    User,
+    UserDailyStats,
+    SyncTombstone,
 )
-from auth import get_current_user 
+from auth import TokenPrincipal, get_token_principal
+from app.sync import TOMBSTONE_ENTITIES, decode_cursor, issue_cursor
+from app.cache import cache_dashboard, get_cached_dashboard
+from app.daily_stats import utc_date
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Cursor positions: () = start of the list, (ts, id) = just past that row,
+# None = list already exhausted
+_START = ()
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _month_window(year: int, month: int) -> tuple[datetime, datetime]:
+    """
+    [first of the month, first of the next month) in UTC.
+    """
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    if month == 12:
+        end = start.replace(year=year + 1, month=1)
+    else:
+        end = start.replace(month=month + 1)
+    return start, end
+
+
+def _current_month_window() -> tuple[datetime, datetime]:
+    now = datetime.now(timezone.utc)
+    return _month_window(now.year, now.month)
+
+
+def _encode_position(position):
+    return None if position is None else [position[0].isoformat(), position[1]]
+
+
+def _decode_position(raw):
+    if raw is None:
+        return None
+    return _as_utc(datetime.fromisoformat(raw[0])), int(raw[1])
+
+
+def _encode_cursor(meals_position, workouts_position) -> Optional[str]:
+    """
+    Opaque cursor for the next page of both detail lists, or None once both
+    are exhausted.
+    """
+    if meals_position is None and workouts_position is None:
+        return None
+    raw = json.dumps({"m": _encode_position(meals_position), "w": _encode_position(workouts_position)})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return _decode_position(data["m"]), _decode_position(data["w"])
+    except (ValueError, TypeError, KeyError, IndexError):
+        raise HTTPException(status_code=400, detail="Invalid dashboard cursor")
+
+
+def _page(query, ts_col, id_col, after, limit: int):
+    """
+    One keyset page of `query`, newest first.
+    Returns (rows, position of the next page or None when done).
+    """
+    if after is None:
+        return [], None
+    if after != _START:
+        query = query.filter(tuple_(ts_col, id_col) < tuple_(*after))
+    rows = query.order_by(ts_col.desc(), id_col.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, (getattr(last, ts_col.key), last.id)
+
+
+def _distinct_dates(db: Session, ts_col, user_col, user_id: int, start: datetime, end: datetime) -> list[str]:
+    """
+    "YYYY-MM-DD" strings of the UTC days in [start, end) with at least one row.
+    """
+    day = utc_date(ts_col)
+    rows = (
+        db.query(day)
+        .filter(user_col == user_id, ts_col >= start, ts_col < end)
+        .distinct()
+        .order_by(day)
+        .all()
+    )
+    return [row[0].isoformat() for row in rows]
+
+
+def _meal_payload(m: Meal) -> dict:
+    items_payload = []
+    for item in m.items:
+        food = item.food
+        items_payload.append(
+            {
+                "id": item.id,
+                "foodId": food.id,
+                "foodName": food.name,
+                "qtyGrams": float(item.qty) if item.qty is not None else None,
+                "caloriesPer100g": float(food.calories_per_100g),
+                "proteinPer100g": float(food.protein_per_100g),
+                "carbsPer100g": float(food.carbs_per_100g),
+                "fatsPer100g": float(food.fats_per_100g),
+                "allergens": food.allergens,
+            }
+        )
+
+    return {
+        "id": m.id,
+        "eatenAt": m.eaten_at.isoformat() if m.eaten_at else None,
+        "createdAt": m.created_at.isoformat() if m.created_at else None,
+        "items": items_payload,
+    }
+
+
+def _workout_payload(w: Workout) -> dict:
+    sets_payload = []
+    for s in w.sets:
+        exercise = s.exercise
+        sets_payload.append(
+            {
+                "id": s.id,
+                "setNo": s.set_no,
+                "reps": s.reps,
+                "weight": float(s.weight) if s.weight is not None else None,
+                "durationSeconds": s.duration_seconds,
+                "calories": float(s.calories) if s.calories is not None else None,
+                "exercise": {
+                    "id": exercise.id,
+                    "name": exercise.name,
+                    "type": exercise.type,
+                    "muscleGroup": exercise.muscle_group,
+                },
+            }
+        )
+
+    return {
+        "id": w.id,
+        "performedAt": w.performed_at.isoformat() if w.performed_at else None,
+        "notes": w.notes,
+        "sets": sets_payload,
+    }
+
+
+def _meals_with_items():
+    return selectinload(Meal.items).selectinload(MealItem.food)
+
+
+def _workouts_with_sets():
+    return (
+        selectinload(Workout.sets)
+        .selectinload(WorkoutSet.exercise)
+        .load_only(Exercise.id, Exercise.name, Exercise.type, Exercise.muscle_group)
+    )
+
 
 @router.get("/")
 def get_calendar_data(
+    from_: Optional[datetime] = Query(None, alias="from", description="Window start (inclusive); defaults to the start of this month"),
+    to: Optional[datetime] = Query(None, description="Window end (exclusive); defaults to the start of next month"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Max meals and max workouts per page"),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),  
+    current_user: TokenPrincipal = Depends(get_token_principal),
 ):
     """
     Calendar + dashboard data for the *logged-in* user.
 
     Uses current_user.id from auth instead of a hardcoded user_id.
+
+    - Only meals/workouts in [from, to) are returned (the current UTC month by
+      default); naive datetimes are taken as UTC. Both filters are served by
+      the (user_id, eaten_at) / (user_id, performed_at) indexes.
+    - mealDates/workoutDates cover the whole window.
+    - meals/workouts are newest first, at most `limit` of each per page. Pass
+      nextCursor (with the same from/to) to get the rest; it is null on the
+      last page.
+    - Items/foods and sets/exercises are eager-loaded with selectinload, so a
+      page costs a fixed number of queries however long the history is.
+    - syncCursor can be passed to GET /dashboard/changes afterwards to fetch
+      only what changed since this response.
+    - The serialized response is cached per user (app.cache.dashboard_cache)
+      until the user logs a meal or workout, so a repeat visit runs no query.
     """
 
     user_id = current_user.id
 
-    meals = (
+    default_start, default_end = _current_month_window()
+    start = _as_utc(from_) if from_ is not None else default_start
+    end = _as_utc(to) if to is not None else default_end
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    view = (start, end, limit, cursor)
+    # Read before querying: a write committed meanwhile bumps the generation,
+    # and the body built below is then not cached
+    body, cache_generation = get_cached_dashboard(user_id, view)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+
+    sync_cursor = issue_cursor(db)
+
+    meals_after, workouts_after = _decode_cursor(cursor) if cursor else (_START, _START)
+
+    meals, next_meals = _page(
         db.query(Meal)
-        .filter(Meal.user_id == user_id)
-        .order_by(Meal.eaten_at.desc())
-        .all()
+        .options(_meals_with_items())
+        .filter(Meal.user_id == user_id, Meal.eaten_at >= start, Meal.eaten_at < end),
+        Meal.eaten_at,
+        Meal.id,
+        meals_after,
+        limit,
     )
 
-    workouts = (
+    workouts, next_workouts = _page(
         db.query(Workout)
-        .filter(Workout.user_id == user_id)
-        .order_by(Workout.performed_at.desc())
-        .all()
+        .options(_workouts_with_sets())
+        .filter(Workout.user_id == user_id, Workout.performed_at >= start, Workout.performed_at < end),
+        Workout.performed_at,
+        Workout.id,
+        workouts_after,
+        limit,
     )
 
     # We send date-only strings ("YYYY-MM-DD") so the frontend doesn't have to parse
-    meal_dates_set = {m.eaten_at.date().isoformat() for m in meals if m.eaten_at}
-    workout_dates_set = {w.performed_at.date().isoformat() for w in workouts if w.performed_at}
-
-    meal_dates = sorted(meal_dates_set)
-    workout_dates = sorted(workout_dates_set)
-
-    meals_payload = []
-    for m in meals:
-        items_payload = []
-        for item in m.items:
-            food = item.food
-            items_payload.append(
-                {
-                    "foodId": food.id,
-                    "foodName": food.name,
-                    "qtyGrams": float(item.qty) if item.qty is not None else None,
-                    "caloriesPer100g": float(food.calories_per_100g),
-                    "proteinPer100g": float(food.protein_per_100g),
-                    "carbsPer100g": float(food.carbs_per_100g),
-                    "fatsPer100g": float(food.fats_per_100g),
-                    "allergens": food.allergens,
-                }
-            )
-
-        meals_payload.append(
-            {
-                "id": m.id,
-                "eatenAt": m.eaten_at.isoformat() if m.eaten_at else None,
-                "createdAt": m.created_at.isoformat() if m.created_at else None,
-                "items": items_payload,
-            }
+    meal_dates = _distinct_dates(db, Meal.eaten_at, Meal.user_id, user_id, start, end)
+    workout_dates = _distinct_dates(db, Workout.performed_at, Workout.user_id, user_id, start, end)
+
+    meals_payload = [_meal_payload(m) for m in meals]
+    workouts_payload = [_workout_payload(w) for w in workouts]
+
+    body = json.dumps(
+        {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "mealDates": meal_dates,
+            "workoutDates": workout_dates,
+            "meals": meals_payload,
+            "workouts": workouts_payload,
+            "nextCursor": _encode_cursor(next_meals, next_workouts),
+            "syncCursor": sync_cursor,
+        },
+        separators=(",", ":"),
+    ).encode()
+    cache_dashboard(user_id, view, body, cache_generation)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/dates")
+def get_calendar_dates(
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM; defaults to the current month"),
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+):
+    """
+    Just the days of `month` (UTC) with a logged meal / workout, for calendar
+    navigation. Two DISTINCT date() queries over the user's timestamp indexes;
+    no meal or workout rows are loaded.
+    """
+    if month is None:
+        start, end = _current_month_window()
+    else:
+        year, month_no = int(month[:4]), int(month[5:])
+        if not 1 <= month_no <= 12:
+            raise HTTPException(status_code=400, detail="Invalid month")
+        start, end = _month_window(year, month_no)
+
+    return {
+        "month": start.strftime("%Y-%m"),
+        "mealDates": _distinct_dates(db, Meal.eaten_at, Meal.user_id, current_user.id, start, end),
+        "workoutDates": _distinct_dates(db, Workout.performed_at, Workout.user_id, current_user.id, start, end),
+    }
+
+
+@router.get("/daily-stats")
+def get_daily_stats(
+    from_: Optional[date] = Query(None, alias="from", description="First day (inclusive); defaults to the start of this month"),
+    to: Optional[date] = Query(None, description="Last day (exclusive); defaults to the start of next month"),
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+):
+    """
+    Per-day nutrition and training totals in [from, to), read from the
+    user_daily_stats rollup (one row per logged day) instead of aggregating
+    meal items and workout sets. Days with nothing logged are omitted.
+    """
+    default_start, default_end = _current_month_window()
+    start = from_ if from_ is not None else default_start.date()
+    end = to if to is not None else default_end.date()
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    rows = (
+        db.query(UserDailyStats)
+        .filter(
+            UserDailyStats.user_id == current_user.id,
+            UserDailyStats.day >= start,
+            UserDailyStats.day < end,
         )
+        .order_by(UserDailyStats.day)
+        .all()
+    )
 
-    workouts_payload = []
-    for w in workouts:
-        sets_payload = []
-        for s in w.sets:
-            exercise = s.exercise
-            sets_payload.append(
-                {
-                    "id": s.id,
-                    "setNo": s.set_no,
-                    "reps": s.reps,
-                    "weight": float(s.weight) if s.weight is not None else None,
-                    "durationSeconds": s.duration_seconds,
-                    "calories": float(s.calories) if s.calories is not None else None,
-                    "exercise": {
-                        "id": exercise.id,
-                        "name": exercise.name,
-                        "type": exercise.type,
-                        "muscleGroup": exercise.muscle_group,
-                    },
-                }
-            )
-
-        workouts_payload.append(
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "days": [
             {
-                "id": w.id,
-                "performedAt": w.performed_at.isoformat() if w.performed_at else None,
-                "notes": w.notes,
-                "sets": sets_payload,
+                "date": row.day.isoformat(),
+                "calories": float(row.calories),
+                "protein": float(row.protein),
+                "carbs": float(row.carbs),
+                "fats": float(row.fats),
+                "sets": row.sets,
+                "reps": row.reps,
+                "tonnage": float(row.tonnage),
             }
+            for row in rows
+        ],
+    }
+
+
+@router.get("/changes")
+def get_changes(
+    since: str = Query(..., description="syncCursor from GET /dashboard/ or nextCursor from the previous call"),
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+):
+    """
+    Meals, workouts and deletions since `since`, for clients that already
+    hold the dashboard data.
+
+    - meals/workouts: every meal (workout) that was created or updated, or whose
+      items (sets) were, since the cursor, in the same shape as GET /dashboard/.
+      Apply them as upserts by id.
+    - deleted: ids removed since the cursor, per entity.
+    - nextCursor: pass it as `since` on the next call.
+    - 410 if the cursor is older than the tombstone retention: reload
+      GET /dashboard/ instead.
+    """
+    user_id = current_user.id
+    since_ts = decode_cursor(since)
+    next_cursor = issue_cursor(db)
+
+    changed_items = select(MealItem.meal_id).where(MealItem.updated_at > since_ts)
+    meals = (
+        db.query(Meal)
+        .options(_meals_with_items())
+        .filter(
+            Meal.user_id == user_id,
+            or_(Meal.updated_at > since_ts, Meal.id.in_(changed_items)),
         )
+        .order_by(Meal.eaten_at.desc(), Meal.id.desc())
+        .all()
+    )
+
+    changed_sets = select(WorkoutSet.workout_id).where(WorkoutSet.updated_at > since_ts)
+    workouts = (
+        db.query(Workout)
+        .options(_workouts_with_sets())
+        .filter(
+            Workout.user_id == user_id,
+            or_(Workout.updated_at > since_ts, Workout.id.in_(changed_sets)),
+        )
+        .order_by(Workout.performed_at.desc(), Workout.id.desc())
+        .all()
+    )
+
+    deleted = {entity: [] for entity in TOMBSTONE_ENTITIES}
+    tombstones = (
+        db.query(SyncTombstone.entity, SyncTombstone.entity_id)
+        .filter(SyncTombstone.user_id == user_id, SyncTombstone.deleted_at > since_ts)
+        .order_by(SyncTombstone.id)
+    )
+    for entity, entity_id in tombstones:
+        deleted[entity].append(entity_id)
 
     return {
-        "mealDates": meal_dates,
-        "workoutDates": workout_dates,
-        "meals": meals_payload,
-        "workouts": workouts_payload,
+        "meals": [_meal_payload(m) for m in meals],
+        "workouts": [_workout_payload(w) for w in workouts],
+        "deleted": {
+            "meals": deleted["meal"],
+            "mealItems": deleted["meal_item"],
+            "workouts": deleted["workout"],
+            "workoutSets": deleted["workout_set"],
+        },
+        "nextCursor": next_cursor,
     }
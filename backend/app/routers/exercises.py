@@ -7,7 +7,7 @@ import requests
 from datetime import datetime
 import os
 
-from db.database import SessionLocal
+from db.database import get_db
 from models.exercise import Exercise, UserWorkoutExercise
 from models.user import User
 from schemas.exercise import (
@@ -17,7 +17,7 @@ from schemas.exercise import (
     AddExerciseResponse,
     UserWorkoutExerciseResponse,
 )
-from auth import get_current_user
+from auth import TokenPrincipal, get_current_user, get_token_principal
 
 router = APIRouter(prefix="/api/exercises", tags=["exercises"])
 
@@ -28,14 +28,6 @@ EXERCISEDB_API_HOST = os.getenv(
 EXERCISEDB_BASE_URL = f"https://{EXERCISEDB_API_HOST}/api/v1"
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 def _get_headers() -> dict:
     return {
         "X-RapidAPI-Key": EXERCISEDB_API_KEY or "",
@@ -456,7 +448,7 @@ def get_exercises(
 @router.get("/saved", response_model=ExerciseListResponse)
 def get_saved_exercises(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_token_principal),
 ):
     """
     Get all exercises that the current user has saved (i.e., added to their workouts).
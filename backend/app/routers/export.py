@@ -0,0 +1,201 @@
+"""
+Export of a user's full meal and workout history.
+
+Rows are read through server-side cursors (yield_per) and written to the
+response one batch at a time, so memory stays flat however long the history
+is. The stream uses its own session: it outlives the request's dependencies.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from db.database import SessionLocal
+from models.exercise import Exercise, Workout, WorkoutSet
+from models.meal import Food, Meal, MealItem
+from auth import TokenPrincipal, get_token_principal
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+EXPORT_KINDS = ("meals", "meal_items", "workouts", "workout_sets")
+# NDJSON "type" of each kind's records
+_RECORD_TYPES = {
+    "meals": "meal",
+    "meal_items": "meal_item",
+    "workouts": "workout",
+    "workout_sets": "workout_set",
+}
+
+
+def _meals_query(user_id: int):
+    return (
+        select(
+            Meal.id,
+            Meal.eaten_at.label("eatenAt"),
+            Meal.created_at.label("createdAt"),
+        )
+        .where(Meal.user_id == user_id)
+        .order_by(Meal.id)
+    )
+
+
+def _meal_items_query(user_id: int):
+    return (
+        select(
+            MealItem.id,
+            MealItem.meal_id.label("mealId"),
+            MealItem.food_id.label("foodId"),
+            Food.name.label("foodName"),
+            MealItem.qty.label("qtyGrams"),
+            MealItem.meal_label.label("mealLabel"),
+            Food.calories_per_100g.label("caloriesPer100g"),
+            Food.protein_per_100g.label("proteinPer100g"),
+            Food.carbs_per_100g.label("carbsPer100g"),
+            Food.fats_per_100g.label("fatsPer100g"),
+        )
+        .join(Meal, Meal.id == MealItem.meal_id)
+        .join(Food, Food.id == MealItem.food_id)
+        .where(Meal.user_id == user_id)
+        .order_by(MealItem.id)
+    )
+
+
+def _workouts_query(user_id: int):
+    return (
+        select(
+            Workout.id,
+            Workout.performed_at.label("performedAt"),
+            Workout.notes,
+        )
+        .where(Workout.user_id == user_id)
+        .order_by(Workout.id)
+    )
+
+
+def _workout_sets_query(user_id: int):
+    return (
+        select(
+            WorkoutSet.id,
+            WorkoutSet.workout_id.label("workoutId"),
+            WorkoutSet.exercise_id.label("exerciseId"),
+            Exercise.name.label("exerciseName"),
+            WorkoutSet.set_no.label("setNo"),
+            WorkoutSet.reps,
+            WorkoutSet.weight,
+            WorkoutSet.duration_seconds.label("durationSeconds"),
+            WorkoutSet.calories,
+        )
+        .join(Workout, Workout.id == WorkoutSet.workout_id)
+        .join(Exercise, Exercise.id == WorkoutSet.exercise_id)
+        .where(Workout.user_id == user_id)
+        .order_by(WorkoutSet.id)
+    )
+
+
+_QUERIES = {
+    "meals": _meals_query,
+    "meal_items": _meal_items_query,
+    "workouts": _workouts_query,
+    "workout_sets": _workout_sets_query,
+}
+
+
+def _plain(value):
+    """
+    JSON/CSV-friendly value: ISO timestamps, floats for Numeric columns.
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return float(value)
+
+
+def _batches(user_id: int, kinds: tuple[str, ...]):
+    """
+    (kind, column names, list of rows) per server-side cursor fetch.
+    """
+    db = SessionLocal()
+    try:
+        for kind in kinds:
+            result = db.execute(
+                _QUERIES[kind](user_id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+            )
+            columns = list(result.keys())
+            for rows in result.partitions():
+                yield kind, columns, rows
+        db.commit()
+    finally:
+        db.close()
+
+
+def _ndjson(user_id: int, kinds: tuple[str, ...]):
+    for kind, columns, rows in _batches(user_id, kinds):
+        record_type = _RECORD_TYPES[kind]
+        lines = []
+        for row in rows:
+            record = {"type": record_type}
+            record.update(zip(columns, map(_plain, row)))
+            lines.append(json.dumps(record, separators=(",", ":")))
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def _csv(user_id: int, kind: str):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+    for _kind, columns, rows in _batches(user_id, (kind,)):
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if not header_written:
+        # No rows: still send the header
+        yield ",".join(_QUERIES[kind](user_id).selected_columns.keys()).encode() + b"\r\n"
+
+
+@router.get("")
+def export_history(
+    format_: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    kind: Optional[str] = Query(None, description="One of meals, meal_items, workouts, workout_sets"),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+):
+    """
+    Stream the logged-in user's history.
+
+    - ndjson (default): one JSON object per line, each with a "type" of meal,
+      meal_item, workout or workout_set; all kinds unless `kind` is given.
+      Items/sets reference their meal/workout by id.
+    - csv: one kind per file, so `kind` is required.
+    """
+    if kind is not None and kind not in EXPORT_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(EXPORT_KINDS)}")
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d")
+    if format_ == "csv":
+        if kind is None:
+            raise HTTPException(status_code=400, detail="CSV export needs a kind")
+        return StreamingResponse(
+            _csv(current_user.id, kind),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="peak-{kind}-{stamp}.csv"'},
+        )
+
+    kinds = (kind,) if kind is not None else EXPORT_KINDS
+    return StreamingResponse(
+        _ndjson(current_user.id, kinds),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="peak-export-{stamp}.ndjson"'},
+    )
@@ -1,122 +1,645 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+import json
+import math
+import uuid
+from bisect import bisect_left
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, exists, func, or_, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, NamedTuple, Optional
 
-from db.session import SessionLocal
+from db.database import get_db
 from models.user import User
-from auth import get_current_user
-from schemas.leaderboard import LeaderboardItem, LeaderboardSummary
+from models.leaderboard import UserWeeklyXP, LeaderboardSnapshot
+from auth import TokenPrincipal, get_token_principal
+from app.leaderboard_index import leaderboard_index, RankedUser
+from app.leaderboard_events import leaderboard_broadcaster, LEADERBOARD_STREAM_MAX_SUBSCRIBERS
+from app.scheduler import current_week_start
+from schemas.leaderboard import (
+    LeaderboardItem,
+    LeaderboardPage,
+    LeaderboardStats,
+    LeaderboardSummary,
+    XPHistogramBucket,
+    XPQuantileCutoffs,
+)
 
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+HISTOGRAM_BUCKETS = 10
+
+# Distinguishes this process's version counter from other workers'/restarts'
+_ETAG_PREFIX = uuid.uuid4().hex[:8]
+
+
+def _not_modified(
+    request: Request,
+    response: Response,
+    current_user: Optional[TokenPrincipal] = None,
+) -> Optional[Response]:
+    """
+    Conditional GET on the leaderboard version.
+
+    Sets the ETag (per user for personal endpoints) on `response` and returns a
+    304 Response if the client already has it, so the caller can return before
+    running any query or serialization.
+    """
+    # The week is part of the tag: Monday's rollover changes standings even
+    # before the reset job bumps the version
+    etag = f'W/"lb-{_ETAG_PREFIX}-{current_week_start().isoformat()}-{leaderboard_index.version}'
+    if current_user is not None:
+        etag += f'-u{current_user.id}'
+    etag += '"'
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in candidates or etag in candidates or etag[2:] in candidates:
+            return Response(status_code=304, headers=headers)
+    return None
+
 
-def get_db():
-    db = SessionLocal()
+def _item(row: RankedUser) -> LeaderboardItem:
+    return LeaderboardItem(username=row.username, weekly_points=row.weekly_xp, rank=row.rank)
+
+
+def _ahead_of(weekly_xp: int, user_id: int):
+    """
+    Filter for ledger rows ranked strictly ahead of (weekly_xp, user_id) in the
+    weekly ordering (xp DESC, user_id ASC).
+    """
+    return or_(
+        UserWeeklyXP.xp > weekly_xp,
+        and_(UserWeeklyXP.xp == weekly_xp, UserWeeklyXP.user_id < user_id),
+    )
+
+
+def _behind(weekly_xp: int, user_id: int):
+    """
+    Filter for ledger rows ranked strictly behind (weekly_xp, user_id).
+    """
+    return or_(
+        UserWeeklyXP.xp < weekly_xp,
+        and_(UserWeeklyXP.xp == weekly_xp, UserWeeklyXP.user_id > user_id),
+    )
+
+
+def _earners(db: Session, week_start: date):
+    """
+    Users with XP this week, straight off the current week's slice of
+    ix_user_weekly_xp_week_xp_desc_user. They make up the top of the board.
+    """
+    return (
+        db.query(UserWeeklyXP.user_id, User.username, UserWeeklyXP.xp)
+        .join(User, User.id == UserWeeklyXP.user_id)
+        .filter(UserWeeklyXP.week_start == week_start, UserWeeklyXP.xp > 0)
+    )
+
+
+def _non_earners(db: Session, week_start: date):
+    """
+    Users with 0 XP this week (no positive ledger row). They follow the
+    earners on the board, ordered by id.
+    """
+    has_xp = exists().where(
+        UserWeeklyXP.user_id == User.id,
+        UserWeeklyXP.week_start == week_start,
+        UserWeeklyXP.xp > 0,
+    )
+    return db.query(User.id, User.username).filter(~has_xp)
+
+
+def _scan_down(
+    db: Session,
+    week_start: date,
+    after: Optional[tuple[int, int]],
+    limit: int,
+) -> list[tuple[int, str, int]]:
+    """
+    Up to `limit` (user_id, username, weekly_xp) rows ranked after the
+    (weekly_xp, user_id) position, or from the top when `after` is None.
+    """
+    rows: list[tuple[int, str, int]] = []
+    after_id = 0
+    if after is None or after[0] > 0:
+        query = _earners(db, week_start)
+        if after is not None:
+            query = query.filter(_behind(*after))
+        rows = [
+            (row.user_id, row.username, row.xp)
+            for row in query
+            .order_by(UserWeeklyXP.xp.desc(), UserWeeklyXP.user_id.asc())
+            .limit(limit)
+        ]
+        if len(rows) == limit:
+            return rows
+    else:
+        after_id = after[1]
+
+    rows += [
+        (row.id, row.username, 0)
+        for row in _non_earners(db, week_start)
+        .filter(User.id > after_id)
+        .order_by(User.id.asc())
+        .limit(limit - len(rows))
+    ]
+    return rows
+
+
+def _scan_up(
+    db: Session,
+    week_start: date,
+    before: tuple[int, int],
+    limit: int,
+) -> list[tuple[int, str, int]]:
+    """
+    Up to `limit` rows ranked before the (weekly_xp, user_id) position,
+    nearest first.
+    """
+    rows: list[tuple[int, str, int]] = []
+    query = _earners(db, week_start)
+    if before[0] > 0:
+        query = query.filter(_ahead_of(*before))
+    else:
+        rows = [
+            (row.id, row.username, 0)
+            for row in _non_earners(db, week_start)
+            .filter(User.id < before[1])
+            .order_by(User.id.desc())
+            .limit(limit)
+        ]
+        if len(rows) == limit:
+            return rows
+
+    rows += [
+        (row.user_id, row.username, row.xp)
+        for row in query
+        .order_by(UserWeeklyXP.xp.asc(), UserWeeklyXP.user_id.desc())
+        .limit(limit - len(rows))
+    ]
+    return rows
+
+
+def _encode_cursor(weekly_xp: int, user_id: int, rank: int) -> str:
+    """
+    Opaque cursor pointing just past a leaderboard row.
+    The rank rides along so the next page can keep numbering without a count.
+    """
+    raw = json.dumps({"xp": weekly_xp, "id": user_id, "rank": rank})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[int, int, int]:
     try:
-        yield db
-    finally:
-        db.close()
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(data["xp"]), int(data["id"]), int(data["rank"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid leaderboard cursor")
+
 
+def _page_from_index(
+    limit: int,
+    after: Optional[tuple[int, int, int]] = None,
+    with_cursor: bool = True,
+) -> LeaderboardPage:
+    """
+    Same page as _build_weekly_leaderboard, served from the in-process index.
+    """
+    rows, has_more = leaderboard_index.page(limit, after[:2] if after else None)
+    items = [_item(row) for row in rows]
 
+    next_cursor = None
+    if with_cursor and has_more and rows:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.weekly_xp, last.user_id, last.rank)
 
-def _build_weekly_leaderboard(db: Session) -> List[LeaderboardItem]:
+    return LeaderboardPage(items=items, next_cursor=next_cursor)
+
+
+def _build_weekly_leaderboard(
+    db: Session,
+    limit: int,
+    after: Optional[tuple[int, int, int]] = None,
+    with_cursor: bool = True,
+) -> LeaderboardPage:
     """
-    Build the weekly leaderboard from the users table:
+    Build one page of the current week's leaderboard:
 
-    - Order users by users.weekly_xp DESC, then by users.id ASC for stability.
+    - Order users by this week's XP DESC, then by users.id ASC for stability.
+      Users who earned XP come from user_weekly_xp; everybody else follows
+      with 0 XP.
+    - `after` is a decoded cursor (weekly_xp, id, rank) of the last row already
+      seen; the page continues right behind it (keyset pagination), so each
+      page is a bounded index scan.
+    - with_cursor=False reads exactly `limit` rows and never returns a cursor.
     - For API compatibility, we still expose the field as `weekly_points`,
-      but its value is actually users.weekly_xp.
+      but its value is the user's weekly XP.
     """
-    rows = (
-        db.query(User)
-        .order_by(User.weekly_xp.desc(), User.id.asc())
-        .all()
-    )
+    week_start = current_week_start()
 
-    leaderboard: List[LeaderboardItem] = []
-    for idx, user in enumerate(rows, start=1):
-        leaderboard.append(
+    start_rank = 0
+    position = None
+    if after is not None:
+        after_xp, after_id, start_rank = after
+        position = (after_xp, after_id)
+
+    # One extra row tells us whether there is a next page
+    rows = _scan_down(db, week_start, position, limit + 1 if with_cursor else limit)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items: List[LeaderboardItem] = []
+    for idx, (_user_id, username, weekly_xp) in enumerate(rows, start=start_rank + 1):
+        items.append(
             LeaderboardItem(
-                username=user.username,
-                weekly_points=user.weekly_xp or 0,
+                username=username,
+                weekly_points=weekly_xp,
                 rank=idx,
             )
         )
-    return leaderboard
+
+    next_cursor = None
+    if has_more:
+        last_id, _username, last_xp = rows[-1]
+        next_cursor = _encode_cursor(last_xp, last_id, items[-1].rank)
+
+    return LeaderboardPage(items=items, next_cursor=next_cursor)
 
 
-@router.get("/weekly", response_model=List[LeaderboardItem])
-def get_weekly_leaderboard(db: Session = Depends(get_db)):
+def _weekly_xp(db: Session, user_id: int, week_start: date) -> int:
     """
-    Full weekly leaderboard (sorted by users.weekly_xp desc).
+    A user's XP for the given week (primary key lookup; 0 without a row).
     """
-    return _build_weekly_leaderboard(db)
+    xp = (
+        db.query(UserWeeklyXP.xp)
+        .filter(UserWeeklyXP.user_id == user_id, UserWeeklyXP.week_start == week_start)
+        .scalar()
+    )
+    return xp or 0
+
+
+def _weekly_rank(db: Session, user_id: int, weekly_xp: int, week_start: date) -> int:
+    """
+    1-based rank of a user in the weekly leaderboard.
+
+    Counts the users ahead of them instead of loading the whole table:
+    earners are a range count on the week's ledger index, and a 0 XP user is
+    additionally behind every lower-id non-earner.
+    """
+    earners_ahead = (
+        db.query(func.count(UserWeeklyXP.user_id))
+        .filter(UserWeeklyXP.week_start == week_start, UserWeeklyXP.xp > 0)
+    )
+    if weekly_xp > 0:
+        return earners_ahead.filter(_ahead_of(weekly_xp, user_id)).scalar() + 1
+
+    non_earners_ahead = (
+        _non_earners(db, week_start)
+        .filter(User.id < user_id)
+        .with_entities(func.count(User.id))
+        .scalar()
+    )
+    return earners_ahead.scalar() + non_earners_ahead + 1
+
+
+def _weekly_window(db: Session, user: TokenPrincipal, k: int) -> List[LeaderboardItem]:
+    """
+    The k users directly above and below `user` in the weekly leaderboard,
+    with the user in the middle.
+
+    Same ordering as _build_weekly_leaderboard: the rank comes from the index
+    count, then each side is one bounded scan walking away from the user.
+    """
+    if leaderboard_index.is_warm:
+        rows = leaderboard_index.around(user.id, k)
+        if rows is not None:
+            return [_item(row) for row in rows]
+
+    week_start = current_week_start()
+    weekly_xp = _weekly_xp(db, user.id, week_start)
+    rank = _weekly_rank(db, user.id, weekly_xp, week_start)
+
+    above = _scan_up(db, week_start, (weekly_xp, user.id), k)
+    below = _scan_down(db, week_start, (weekly_xp, user.id), k)
+
+    window: List[LeaderboardItem] = []
+    for idx, (_user_id, username, xp) in enumerate(reversed(above), start=rank - len(above)):
+        window.append(LeaderboardItem(username=username, weekly_points=xp, rank=idx))
+    window.append(
+        LeaderboardItem(username=user.username, weekly_points=weekly_xp, rank=rank)
+    )
+    for idx, (_user_id, username, xp) in enumerate(below, start=rank + 1):
+        window.append(LeaderboardItem(username=username, weekly_points=xp, rank=idx))
+    return window
+
+
+class _XPDistribution(NamedTuple):
+    # (week_start, leaderboard version) the distribution was computed for
+    key: tuple[date, int]
+    # Every user's weekly XP, lowest first
+    values: list[int]
+    cutoffs: XPQuantileCutoffs
+    histogram: List[XPHistogramBucket]
+
+
+_distribution_cache: Optional[_XPDistribution] = None
+
+
+def _weekly_xp_values(db: Session, week_start: date) -> list[int]:
+    """
+    Every user's weekly XP, highest first. Reads the index when warm, else the
+    ledger's xp column alone plus one 0 per user without XP this week.
+    """
+    if leaderboard_index.is_warm:
+        return leaderboard_index.weekly_xp_values()
+
+    earned = list(
+        db.execute(
+            select(UserWeeklyXP.xp)
+            .where(UserWeeklyXP.week_start == week_start, UserWeeklyXP.xp > 0)
+            .order_by(UserWeeklyXP.xp.desc())
+        ).scalars()
+    )
+    total_users = db.query(func.count(User.id)).scalar()
+    return earned + [0] * (total_users - len(earned))
+
+
+def _xp_distribution(db: Session, week_start: date) -> _XPDistribution:
+    """
+    Cutoffs and histogram of this week's XP, computed once per leaderboard
+    version and shared by every user's /stats request.
+    """
+    global _distribution_cache
+    key = (week_start, leaderboard_index.version)
+    cached = _distribution_cache
+    if cached is not None and cached.key == key:
+        return cached
+
+    descending = _weekly_xp_values(db, week_start)
+    total = len(descending)
+
+    def cutoff(top_percent: int) -> int:
+        if not total:
+            return 0
+        return descending[max(math.ceil(total * top_percent / 100), 1) - 1]
+
+    cutoffs = XPQuantileCutoffs(
+        top_1_percent=cutoff(1),
+        top_10_percent=cutoff(10),
+        top_50_percent=cutoff(50),
+    )
+
+    # Equal-width buckets from 0 to the top score
+    top = descending[0] if descending else 0
+    width = max(math.ceil((top + 1) / HISTOGRAM_BUCKETS), 1)
+    counts = [0] * HISTOGRAM_BUCKETS
+    for xp in descending:
+        counts[min(xp // width, HISTOGRAM_BUCKETS - 1)] += 1
+    histogram = [
+        XPHistogramBucket(min_xp=i * width, max_xp=(i + 1) * width - 1, count=count)
+        for i, count in enumerate(counts)
+    ]
+
+    _distribution_cache = _XPDistribution(key, descending[::-1], cutoffs, histogram)
+    return _distribution_cache
+
+
+@router.get("/weekly", response_model=LeaderboardPage)
+def get_weekly_leaderboard(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    top: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Only return the top N users"),
+    db: Session = Depends(get_db),
+):
+    """
+    Weekly leaderboard (sorted by this week's XP desc), one page at a time.
+
+    - Pass the previous page's next_cursor to continue where it stopped.
+    - `top=N` returns just the first N users (no cursor).
+    - Revalidate with If-None-Match: 304 until the standings change.
+    """
+    not_modified = _not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
+
+    if top is not None:
+        if leaderboard_index.is_warm:
+            return _page_from_index(top, with_cursor=False)
+        return _build_weekly_leaderboard(db, top, with_cursor=False)
+
+    after = _decode_cursor(cursor) if cursor else None
+    if leaderboard_index.is_warm:
+        return _page_from_index(limit, after)
+    return _build_weekly_leaderboard(db, limit, after)
+
+
+@router.get("/stream")
+async def stream_weekly_leaderboard():
+    """
+    Live weekly leaderboard updates as Server-Sent Events.
+
+    - `rank_change`: {username, weekly_xp, previous_rank, rank, version}.
+      Users ranked in [rank, previous_rank) move down one place.
+    - `resync`: refetch /leaderboard/weekly (sent on connect, after resets, and
+      instead of the backlog when this client falls behind).
+    """
+    if leaderboard_broadcaster.subscriber_count >= LEADERBOARD_STREAM_MAX_SUBSCRIBERS:
+        raise HTTPException(status_code=503, detail="Too many leaderboard stream subscribers")
+
+    return StreamingResponse(
+        leaderboard_broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/history/{week}", response_model=LeaderboardPage)
+def get_leaderboard_history(
+    week: date,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db),
+):
+    """
+    Final standings of a past week, read from leaderboard_snapshots.
+
+    - `week` is any date in that week (normalized to its Monday).
+    - Pages are keyset on the archived rank; pass next_cursor to continue.
+    """
+    week_start = week - timedelta(days=week.weekday())
+
+    after_rank = 0
+    if cursor:
+        try:
+            after_rank = int(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid leaderboard cursor")
+
+    rows = (
+        db.query(LeaderboardSnapshot.rank, LeaderboardSnapshot.username, LeaderboardSnapshot.weekly_xp)
+        .filter(
+            LeaderboardSnapshot.week_start == week_start,
+            LeaderboardSnapshot.rank > after_rank,
+        )
+        .order_by(LeaderboardSnapshot.rank.asc())
+        .limit(limit + 1)
+        .all()
+    )
+    if not rows and after_rank == 0:
+        raise HTTPException(
+            status_code=404,
+            detail="No leaderboard snapshot for that week",
+        )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [
+        LeaderboardItem(username=row.username, weekly_points=row.weekly_xp, rank=row.rank)
+        for row in rows
+    ]
+
+    return LeaderboardPage(
+        items=items,
+        next_cursor=str(rows[-1].rank) if has_more else None,
+    )
 
 
 @router.get("/me", response_model=LeaderboardItem)
 def get_my_weekly_rank(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_token_principal),
 ):
     """
     Current user's weekly points + rank.
 
-    - Rank is computed from users.weekly_xp.
-    - weekly_points in the response is actually users.weekly_xp.
+    - Rank is computed from this week's XP (user_weekly_xp).
+    - weekly_points in the response is actually the weekly XP.
     """
-    leaderboard = _build_weekly_leaderboard(db)
+    not_modified = _not_modified(request, response, current_user)
+    if not_modified is not None:
+        return not_modified
+
+    if leaderboard_index.is_warm:
+        entry = leaderboard_index.get(current_user.id)
+        if entry is not None:
+            return _item(entry)
 
-    for item in leaderboard:
-        if item.username == current_user.username:
-            return item
+    week_start = current_week_start()
+    weekly_xp = _weekly_xp(db, current_user.id, week_start)
 
-    # Fallback: user not found in leaderboard (shouldn't happen if they exist in users)
-    raise HTTPException(
-        status_code=404,
-        detail="Leaderboard entry not found for current user",
+    return LeaderboardItem(
+        username=current_user.username,
+        weekly_points=weekly_xp,
+        rank=_weekly_rank(db, current_user.id, weekly_xp, week_start),
     )
 
 
+@router.get("/me/around", response_model=List[LeaderboardItem])
+def get_my_weekly_neighbours(
+    request: Request,
+    response: Response,
+    k: int = Query(5, ge=1, le=50, description="Users to include above and below"),
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+):
+    """
+    Slice of the weekly leaderboard centred on the current user:
+    up to k users ranked above, the user, then up to k users below.
+    """
+    not_modified = _not_modified(request, response, current_user)
+    if not_modified is not None:
+        return not_modified
+
+    return _weekly_window(db, current_user, k)
+
+
 @router.get("/me/summary", response_model=LeaderboardSummary)
 def get_my_dashboard_summary(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_token_principal),
 ):
     """
     Compact summary for the dashboard card:
 
-    - Rank in the weekly leaderboard, computed from users.weekly_xp.
-    - weekly_xp from users.weekly_xp.
+    - Rank in the weekly leaderboard, computed from this week's XP.
+    - weekly_xp from the user's user_weekly_xp row for this week.
     - weekly_points mirrors weekly_xp for compatibility with existing types.
     """
+    not_modified = _not_modified(request, response, current_user)
+    if not_modified is not None:
+        return not_modified
 
-    # 1) Compute rank based on users.weekly_xp
-    rows = (
-        db.query(User.id, User.weekly_xp)
-        .order_by(User.weekly_xp.desc(), User.id.asc())
-        .all()
+    if leaderboard_index.is_warm:
+        entry = leaderboard_index.get(current_user.id)
+        if entry is not None:
+            return LeaderboardSummary(
+                rank=entry.rank,
+                weekly_xp=entry.weekly_xp,
+                weekly_points=entry.weekly_xp,
+            )
+
+    week_start = current_week_start()
+    weekly_xp = _weekly_xp(db, current_user.id, week_start)
+
+    return LeaderboardSummary(
+        rank=_weekly_rank(db, current_user.id, weekly_xp, week_start),
+        weekly_xp=weekly_xp,
+        weekly_points=weekly_xp,
     )
 
-    rank: int | None = None
-    weekly_points: int = 0
 
-    for idx, row in enumerate(rows, start=1):
-        if row.id == current_user.id:
-            rank = idx
-            weekly_points = row.weekly_xp or 0
-            break
+@router.get("/stats", response_model=LeaderboardStats)
+def get_weekly_xp_stats(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_token_principal),
+):
+    """
+    This week's XP distribution and where the current user sits in it:
 
-    # 2) weekly_xp from the users table for this logged-in user
-    weekly_xp = current_user.weekly_xp or 0
+    - percentile: share of users with less weekly XP than you.
+    - cutoffs: weekly XP needed for the top 1% / 10% / 50%.
+    - histogram: user counts in equal-width XP buckets.
+    """
+    not_modified = _not_modified(request, response, current_user)
+    if not_modified is not None:
+        return not_modified
 
-    # If for some reason the user wasn't in the rows (shouldn't happen),
-    # just default rank to None and weekly_points = weekly_xp.
-    if rank is None:
-        weekly_points = weekly_xp
+    week_start = current_week_start()
+    distribution = _xp_distribution(db, week_start)
 
-    return LeaderboardSummary(
-        rank=rank,
+    entry = leaderboard_index.get(current_user.id) if leaderboard_index.is_warm else None
+    if entry is not None:
+        weekly_xp, rank = entry.weekly_xp, entry.rank
+    else:
+        weekly_xp = _weekly_xp(db, current_user.id, week_start)
+        rank = _weekly_rank(db, current_user.id, weekly_xp, week_start)
+
+    total = len(distribution.values)
+    below = bisect_left(distribution.values, weekly_xp)
+
+    return LeaderboardStats(
+        week_start=week_start,
+        total_users=total,
         weekly_xp=weekly_xp,
-        weekly_points=weekly_points,
+        rank=rank,
+        percentile=round(100 * below / total, 2) if total else 0.0,
+        cutoffs=distribution.cutoffs,
+        histogram=distribution.histogram,
     )
@@ -1,12 +1,16 @@
 from datetime import datetime, timezone, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import delete
 from sqlalchemy.orm import Session, joinedload
 from typing import Optional
 from db.database import get_db
 from models.meal import Meal, MealItem
 from models.user import User
 from schemas.meal import MealWithItems, MealDaySubmit
-from auth import get_current_user
+from auth import TokenPrincipal, get_current_user, get_token_principal
+from app.daily_stats import refresh_day_nutrition, utc_day
+from app.sync import record_deletions
+from app.cache import invalidate_dashboard
 
 router = APIRouter(prefix = "/meal-logger", tags = ["meal logger"])
 
@@ -39,7 +43,7 @@ def get_meal_for_day(db: Session, user_id: int, dt: datetime) -> Meal | None:
     return meal
 
 @router.get("/today", response_model = Optional[MealWithItems])
-def get_log(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_log(db: Session = Depends(get_db), current_user: TokenPrincipal = Depends(get_token_principal)):
     """
     Load the current user's meal for 'today'.
     If a meal exists for today, return said meal. Otherwise return None.
@@ -78,7 +82,10 @@ def complete_log(payload: MealDaySubmit, db: Session = Depends(get_db), current_
         db.commit()
         db.refresh(meal)
     else:
-        db.query(MealItem).filter(MealItem.meal_id == meal.id).delete()
+        deleted_ids = db.execute(
+            delete(MealItem).where(MealItem.meal_id == meal.id).returning(MealItem.id)
+        ).scalars().all()
+        record_deletions(db, current_user.id, "meal_item", deleted_ids)
         db.commit()
 
     for item in payload.items:
@@ -90,7 +97,13 @@ def complete_log(payload: MealDaySubmit, db: Session = Depends(get_db), current_
         )
         db.add(meal_item)
 
+    # Keep the day's nutrition rollup in step, in the same transaction. The
+    # rollup is keyed by UTC date, and only this meal's items changed, so its
+    # UTC day is the one to recompute (start may be midnight in another offset)
+    db.flush()
+    refresh_day_nutrition(db, current_user.id, utc_day(meal.eaten_at))
     db.commit()
+    invalidate_dashboard(current_user.id)
 
     db.refresh(meal)
     meal = db.query(Meal).options(joinedload(Meal.items).joinedload(MealItem.food)).filter(
@@ -1,23 +1,15 @@
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
-from db.database import SessionLocal
+from db.database import get_db
 from models.questionnaire import QuestionnaireQuestion, UserQuestionnaireAnswer
 from models.user import User
 from schemas.questionnaire import QuestionItem, SubmitAnswers, LatestAnswerItem
-from auth import get_current_user
+from auth import TokenPrincipal, get_current_user, get_token_principal
 
 
 router = APIRouter(prefix="/api/questionnaire", tags=["questionnaire"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.get("/questions", response_model = list[QuestionItem])
 def get_questions(db: Session = Depends(get_db)):
     qs = db.query(QuestionnaireQuestion).order_by(QuestionnaireQuestion.sort_order.asc()).all()
@@ -48,7 +40,7 @@ def submit_answers(data: SubmitAnswers, current_user: User = Depends(get_current
 
 
 @router.get("/latest", response_model=list[LatestAnswerItem])
-def get_latest(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_latest(current_user: TokenPrincipal = Depends(get_token_principal), db: Session = Depends(get_db)):
     answers = (
         db.query(UserQuestionnaireAnswer)
         .filter(UserQuestionnaireAnswer.user_id == current_user.id)
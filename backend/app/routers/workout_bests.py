@@ -2,27 +2,18 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from db.database import SessionLocal
+from db.database import get_db
 from models.exercise import Exercise, WorkoutSet, Workout
-from models.user import User
 from schemas.workout_bests import WorkoutBest
-from auth import get_current_user
+from auth import TokenPrincipal, get_token_principal
 
 
 router = APIRouter(prefix="/api/workouts", tags=["workouts"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.get("/bests", response_model=list[WorkoutBest])
 def get_workout_bests(
-    current_user: User = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_token_principal),
     db: Session = Depends(get_db),
 ):
     """
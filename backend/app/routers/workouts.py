@@ -1,23 +1,26 @@
+import os
+import tempfile
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from db.database import SessionLocal
-from models.exercise import Exercise, Workout, WorkoutSet
+from db.database import get_db
+from models.exercise import Workout, WorkoutSet, normalize_exercise_name
 from models.user import User
-from schemas.workouts import WorkoutCreate, WorkoutCreateResponse
+from schemas.workouts import WorkoutCreate, WorkoutCreateResponse, WorkoutImportResponse
 from auth import get_current_user
+from app.daily_stats import add_workout_volume
+from app.cache import invalidate_dashboard
+from app.workout_import import import_workouts
+from app.exercise_lookup import resolve_exercise_ids
 
-router = APIRouter(prefix="/api/workouts", tags=["workouts"])
-
+WORKOUT_IMPORT_MAX_BYTES = int(os.getenv("WORKOUT_IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+# Uploads larger than this are spooled to a temporary file instead of memory
+_IMPORT_SPOOL_BYTES = 1024 * 1024
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter(prefix="/api/workouts", tags=["workouts"])
 
 
 @router.post("/", response_model=WorkoutCreateResponse)
@@ -46,9 +49,11 @@ def create_workout(
     }
 
     For each exercise name, we either:
-      - find an existing Exercise by name (case-insensitive), or
+      - find an existing Exercise by name (case-insensitive, whitespace
+        collapsed), or
       - create a new Exercise row with minimal info.
-    Then we create WorkoutSet rows linked to that Exercise.
+    All names are resolved together (app.exercise_lookup). Then we create
+    WorkoutSet rows linked to that Exercise.
     """
     if not payload.exercises:
         raise HTTPException(
@@ -74,35 +79,11 @@ def create_workout(
             detail="Workout has no valid exercises or sets",
         )
 
-    # Prepare / find Exercise rows
-    exercise_ids: list[int] = []
-    for name, _sets in cleaned_exercises:
-        # Try to find an existing exercise by name (case-insensitive)
-        existing = (
-            db.query(Exercise)
-            .filter(Exercise.name.ilike(name))
-            .first()
-        )
-
-        if existing:
-            ex_row = existing
-        else:
-            # Create a minimal custom exercise row
-            ex_row = Exercise(
-                name=name,
-                type="strength",          # default
-                muscle_group="Unknown",   # default
-                body_part=None,
-                equipment_type=None,
-                thumbnail_url=None,
-                gif_url=None,
-                instructions=None,
-                external_id=None,        # user-created, no external_id
-            )
-            db.add(ex_row)
-            db.flush()  # assign ex_row.id
-
-        exercise_ids.append(ex_row.id)
+    # Resolve every exercise name in one query (normalized, indexed match);
+    # unknown names become minimal custom exercises in one multi-row insert
+    exercise_ids_by_name: dict[str, int] = {}
+    resolve_exercise_ids(db, [name for name, _sets in cleaned_exercises], exercise_ids_by_name)
+    exercise_ids = [exercise_ids_by_name[normalize_exercise_name(name)] for name, _sets in cleaned_exercises]
 
     # Now create the Workout row itself
     performed_at = payload.performed_at or datetime.now(timezone.utc)
@@ -127,7 +108,52 @@ def create_workout(
             )
             db.add(ws)
 
+    # Add this workout's sets/reps/tonnage to the day's rollup
+    add_workout_volume(db, workout)
+
     db.commit()
+    invalidate_dashboard(current_user.id)
     db.refresh(workout)
 
     return WorkoutCreateResponse(status="ok", workout_id=workout.id)
+
+
+@router.post("/import", response_model=WorkoutImportResponse)
+async def import_workout_history(
+    request: Request,
+    weight_unit: str = Query("kg", pattern="^(kg|lb)$", description="Unit of Strong's Weight column"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Import workout history from a Strong or Hevy CSV export, sent as the raw
+    request body (Content-Type: text/csv). The format is detected from the
+    header row.
+
+    The body is spooled (to disk past 1 MB) while it is received, then parsed
+    row by row and written in chunks with one transaction each (see
+    app.workout_import). Workouts already present (same start time) are
+    skipped, so re-uploading a file is safe.
+    """
+    upload = tempfile.SpooledTemporaryFile(max_size=_IMPORT_SPOOL_BYTES)
+    try:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > WORKOUT_IMPORT_MAX_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"CSV larger than {WORKOUT_IMPORT_MAX_BYTES} bytes",
+                )
+            upload.write(chunk)
+        upload.seek(0)
+
+        try:
+            stats = await run_in_threadpool(import_workouts, db, current_user.id, upload, weight_unit)
+        finally:
+            # Chunks committed before a failure are visible too
+            invalidate_dashboard(current_user.id)
+    finally:
+        upload.close()
+
+    return WorkoutImportResponse(status="ok", **stats)
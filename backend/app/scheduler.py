@@ -1,42 +1,132 @@
 """
-Weekly scheduler to reset the leaderboard (users.weekly_xp = 0) every Monday at midnight UTC.
-Also checks on startup if a reset is needed.
+Weekly scheduler to roll the leaderboard over to a new week every Monday at midnight UTC.
+
+Weekly XP is stored per (user, week_start) in user_weekly_xp, so the rollover
+does not rewrite any XP rows: a new week key starts empty and the old week stays
+as history. The reset job archives the finished week's final ranking into
+leaderboard_snapshots, records the rollover and resets the in-process index.
+
+Resets (weekly and manual) run through run_leaderboard_reset(), which works in
+small batches with one short transaction each and keeps its progress on the
+leaderboard_resets row, so a crashed reset resumes where it stopped.
+Also checks on startup if a reset is needed, periodically verifies the
+in-process leaderboard index against the database, reloads the token
+versions used to revoke access tokens and prunes old dashboard sync tombstones.
 """
 
-from datetime import datetime, timezone, timedelta
+import os
+import time
+from datetime import date, datetime, timezone, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy import update, Column, Integer, DateTime
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import Column, Integer, String, Date, DateTime, and_, delete, insert, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from db.session import SessionLocal
-from models.user import User
 from db.base import Base
+from models.user import User
+from models.leaderboard import UserWeeklyXP, LeaderboardSnapshot
+
+LEADERBOARD_INDEX_CHECK_MINUTES = int(os.getenv("LEADERBOARD_INDEX_CHECK_MINUTES", "5"))
+LEADERBOARD_RESET_BATCH_SIZE = int(os.getenv("LEADERBOARD_RESET_BATCH_SIZE", "5000"))
+TOKEN_VERSION_REFRESH_MINUTES = int(os.getenv("TOKEN_VERSION_REFRESH_MINUTES", "1"))
 
 
-# Track last reset time
+# Track resets and their progress
 class LeaderboardReset(Base):
     __tablename__ = "leaderboard_resets"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    reset_at = Column(DateTime(timezone=True), server_default=func.now())
+    # When the reset finished; NULL while it is still running (or crashed)
+    reset_at = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    # "weekly": archive week_start into leaderboard_snapshots
+    # "manual": clear week_start's user_weekly_xp rows
+    kind = Column(String, nullable=False, default="weekly")
+    week_start = Column(Date)
+    rows_done = Column(Integer, nullable=False, default=0)
+    # Keyset position (xp, user_id) of the last archived row
+    last_xp = Column(Integer)
+    last_user_id = Column(Integer)
+
+
+def current_week_start(now: datetime | None = None) -> date:
+    """
+    Monday (UTC) of the current leaderboard week, i.e. the user_weekly_xp key.
+    """
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(days=now.weekday())).date()
 
 
-def get_last_reset_date():
-    """Get the date of the last reset"""
+def get_last_reset_date(kind: str | None = None):
+    """Get the date of the last finished reset (optionally of one kind)"""
     db = SessionLocal()
     try:
-        last_reset = db.query(LeaderboardReset).order_by(LeaderboardReset.reset_at.desc()).first()
+        query = db.query(LeaderboardReset).filter(LeaderboardReset.reset_at.isnot(None))
+        if kind is not None:
+            query = query.filter(LeaderboardReset.kind == kind)
+        last_reset = query.order_by(LeaderboardReset.reset_at.desc()).first()
         return last_reset.reset_at if last_reset else None
     finally:
         db.close()
 
 
+def carry_over_legacy_weekly_xp():
+    """
+    Move XP still held in users.weekly_xp (written before the user_weekly_xp
+    ledger existed) into the ledger, under the week of the last legacy reset,
+    i.e. the week that XP was earned in.
+
+    One statement zeroes the column and inserts the values it held: the
+    UPDATE ... RETURNING runs over rows locked FOR UPDATE, so a process
+    starting at the same time waits, then finds them at 0 and moves nothing.
+    Every later startup is a no-op.
+    """
+    db = SessionLocal()
+    try:
+        last_reset = db.query(func.max(LeaderboardReset.reset_at)).scalar()
+        week_start = current_week_start(last_reset) if last_reset else current_week_start()
+        legacy = (
+            select(User.id, User.weekly_xp)
+            .where(User.weekly_xp > 0)
+            .with_for_update()
+            .subquery()
+        )
+        moved = (
+            update(User)
+            .where(User.id == legacy.c.id)
+            .values(weekly_xp=0)
+            .returning(User.id, legacy.c.weekly_xp)
+            .cte("moved")
+        )
+        stmt = pg_insert(UserWeeklyXP).from_select(
+            ["user_id", "week_start", "xp"],
+            select(moved.c.id, literal(week_start, Date), moved.c.weekly_xp),
+        )
+        result = db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[UserWeeklyXP.user_id, UserWeeklyXP.week_start],
+                set_={"xp": UserWeeklyXP.xp + stmt.excluded.xp, "updated_at": func.now()},
+            )
+        )
+        db.commit()
+        if result.rowcount:
+            print(f"[{datetime.now(timezone.utc)}] Carried over legacy weekly XP of {result.rowcount} users into week {week_start}.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 def should_reset():
     """
     Check if we need to reset based on the last reset date.
     Reset should happen once per week (every Monday).
     """
-    last_reset = get_last_reset_date()
+    last_reset = get_last_reset_date("weekly")
     now = datetime.now(timezone.utc)
     
     if not last_reset:
@@ -44,41 +134,208 @@ def should_reset():
         return True
     
     # Get Monday of current week
-    days_since_monday = now.weekday()  # 0 = Monday, 6 = Sunday
-    current_week_monday = (now - timedelta(days=days_since_monday)).replace(hour=0, minute=0, second=0, microsecond=0)
+    current_week_monday = datetime.combine(current_week_start(now), datetime.min.time(), tzinfo=timezone.utc)
     
     # If last reset was before this Monday, we need to reset
     return last_reset < current_week_monday
 
 
+def _archive_batch(db: Session, reset: LeaderboardReset, batch_size: int) -> int:
+    """
+    Archive the next `batch_size` rows of reset.week_start's final ranking into
+    leaderboard_snapshots with one INSERT ... SELECT. The batch continues behind
+    the reset's keyset position and row_number() ranks it on top of the rows
+    already archived. Returns rows written.
+    """
+    batch = (
+        select(UserWeeklyXP.user_id, User.username, UserWeeklyXP.xp)
+        .join(User, User.id == UserWeeklyXP.user_id)
+        .where(UserWeeklyXP.week_start == reset.week_start, UserWeeklyXP.xp > 0)
+    )
+    if reset.last_user_id is not None:
+        batch = batch.where(
+            or_(
+                UserWeeklyXP.xp < reset.last_xp,
+                and_(UserWeeklyXP.xp == reset.last_xp, UserWeeklyXP.user_id > reset.last_user_id),
+            )
+        )
+    batch = (
+        batch
+        .order_by(UserWeeklyXP.xp.desc(), UserWeeklyXP.user_id.asc())
+        .limit(batch_size)
+        .subquery()
+    )
+
+    ranking = select(
+        literal(reset.week_start),
+        reset.rows_done + func.row_number().over(
+            order_by=(batch.c.xp.desc(), batch.c.user_id.asc())
+        ),
+        batch.c.user_id,
+        batch.c.username,
+        batch.c.xp,
+    )
+    rows = db.execute(
+        insert(LeaderboardSnapshot)
+        .from_select(["week_start", "rank", "user_id", "username", "weekly_xp"], ranking)
+        .returning(LeaderboardSnapshot.rank, LeaderboardSnapshot.user_id, LeaderboardSnapshot.weekly_xp)
+    ).all()
+
+    if rows:
+        last = max(rows, key=lambda row: row.rank)
+        reset.last_xp = last.weekly_xp
+        reset.last_user_id = last.user_id
+        reset.rows_done += len(rows)
+    return len(rows)
+
+
+def _clear_batch(db: Session, reset: LeaderboardReset, batch_size: int) -> int:
+    """
+    Delete up to `batch_size` of reset.week_start's user_weekly_xp rows.
+    Returns rows deleted.
+    """
+    batch = (
+        select(UserWeeklyXP.user_id)
+        .where(UserWeeklyXP.week_start == reset.week_start)
+        .limit(batch_size)
+    )
+    result = db.execute(
+        delete(UserWeeklyXP).where(
+            UserWeeklyXP.week_start == reset.week_start,
+            UserWeeklyXP.user_id.in_(batch),
+        )
+    )
+    reset.rows_done += result.rowcount
+    return result.rowcount
+
+
+def _finish_reset(db: Session, reset: LeaderboardReset, batch_size: int) -> int:
+    """
+    Run `reset`'s remaining batches, each committed with its progress, then
+    mark it finished. Returns rows processed in this call.
+    """
+    step = _archive_batch if reset.kind == "weekly" else _clear_batch
+    if reset.kind == "weekly" and reset.last_user_id is None:
+        already_archived = (
+            db.query(LeaderboardSnapshot.rank)
+            .filter(LeaderboardSnapshot.week_start == reset.week_start)
+            .first()
+        )
+        if already_archived:
+            step = None
+
+    processed = 0
+    while step is not None:
+        count = step(db, reset, batch_size)
+        db.commit()
+        processed += count
+        if count < batch_size:
+            break
+
+    reset.reset_at = datetime.now(timezone.utc)
+    db.commit()
+    return processed
+
+
+def run_leaderboard_reset(kind: str = "weekly", batch_size: int = LEADERBOARD_RESET_BATCH_SIZE) -> dict:
+    """
+    Shared reset routine for the scheduler and the admin endpoint.
+
+    - kind="weekly" archives last week's final ranking into leaderboard_snapshots.
+    - kind="manual" clears the current week's XP.
+
+    Work is done in batches of `batch_size` rows, each in its own short
+    transaction that also saves the progress on the leaderboard_resets row.
+    An unfinished reset of the same kind and target week is resumed instead
+    of starting over. Unfinished resets of an older week are settled first:
+    a weekly one still archives its week (the ledger keeps it), a manual one
+    is dropped so past weeks' XP is never cleared.
+    Returns the reset's stats, including rows/sec for this run.
+    """
+    # Imported here: app.leaderboard_index -> models -> app.scheduler is circular
+    from app.leaderboard_index import leaderboard_index
+    from app.leaderboard_events import publish_resync
+
+    db = SessionLocal()
+    try:
+        week_start = current_week_start()
+        if kind == "weekly":
+            week_start -= timedelta(days=7)
+
+        unfinished = (
+            db.query(LeaderboardReset)
+            .filter(LeaderboardReset.reset_at.is_(None), LeaderboardReset.kind == kind)
+            .order_by(LeaderboardReset.id.desc())
+            .all()
+        )
+        reset = None
+        for stale in unfinished:
+            if stale.week_start == week_start and reset is None:
+                reset = stale
+            elif kind == "weekly" and stale.week_start is not None and stale.week_start < week_start:
+                print(f"[{datetime.now(timezone.utc)}] Finishing stale weekly leaderboard reset for week {stale.week_start}.")
+                _finish_reset(db, stale, batch_size)
+            else:
+                print(f"[{datetime.now(timezone.utc)}] Abandoning unfinished {kind} leaderboard reset for week {stale.week_start}.")
+                db.delete(stale)
+                db.commit()
+
+        if reset is not None:
+            print(f"[{datetime.now(timezone.utc)}] Resuming {kind} leaderboard reset for week {reset.week_start} after {reset.rows_done} rows.")
+        else:
+            reset = LeaderboardReset(kind=kind, week_start=week_start, rows_done=0, reset_at=None)
+            db.add(reset)
+            db.commit()
+
+        started = time.monotonic()
+        processed = _finish_reset(db, reset, batch_size)
+
+        if kind == "weekly":
+            # The new week may already have XP if the job ran late
+            leaderboard_index.load(db)
+        else:
+            leaderboard_index.reset(current_week_start())
+        publish_resync()
+
+        elapsed = time.monotonic() - started
+        rows_per_sec = processed / elapsed if elapsed > 0 else 0.0
+        print(f"[{datetime.now(timezone.utc)}] {kind.capitalize()} leaderboard reset for week {reset.week_start} completed. {processed} rows in {elapsed:.2f}s ({rows_per_sec:.0f} rows/sec).")
+
+        return {
+            "kind": kind,
+            "week_start": reset.week_start.isoformat(),
+            "rows": reset.rows_done,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(rows_per_sec, 1),
+            "reset_at": reset.reset_at.isoformat(),
+        }
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 def reset_weekly_leaderboard():
     """
-    Reset all users' weekly_xp to 0.
+    Start a new leaderboard week.
     This runs every Monday at 00:00 UTC and also on startup if needed.
+
+    Weekly XP reads are keyed by current_week_start(), so everybody is already
+    at 0 for the new week; this archives last week's standings, records the
+    reset and rolls the in-process index over. No user or XP rows are updated.
+    An interrupted reset is picked up again here (should_reset() only counts
+    finished resets).
     """
     if not should_reset():
         print(f"[{datetime.now(timezone.utc)}] Weekly leaderboard already reset for this week. Skipping.")
         return
     
-    db = SessionLocal()
     try:
-        # Reset weekly_xp for all users
-        result = db.execute(
-            update(User).values(weekly_xp=0)
-        )
-        
-        # Record this reset
-        reset_record = LeaderboardReset()
-        db.add(reset_record)
-        
-        db.commit()
-        print(f"[{datetime.now(timezone.utc)}] Weekly leaderboard reset completed. {result.rowcount} users reset.")
+        run_leaderboard_reset("weekly")
     except Exception as e:
-        db.rollback()
         print(f"[{datetime.now(timezone.utc)}] ERROR resetting weekly leaderboard: {e}")
         raise
-    finally:
-        db.close()
 
 
 def start_scheduler():
@@ -87,6 +344,10 @@ def start_scheduler():
     This should be called once at application startup.
     Also performs an immediate reset check on startup.
     """
+    from app.leaderboard_index import check_leaderboard_index
+    from auth import load_token_versions
+    from app.sync import prune_tombstones
+
     # First, check if we need to reset on startup
     print("[Scheduler] Checking if weekly reset is needed...")
     try:
@@ -104,6 +365,33 @@ def start_scheduler():
         name='Reset weekly leaderboard',
         replace_existing=True
     )
+
+    # Catch leaderboard index drift (e.g. XP awarded by another worker process)
+    scheduler.add_job(
+        check_leaderboard_index,
+        trigger=IntervalTrigger(minutes=LEADERBOARD_INDEX_CHECK_MINUTES),
+        id='leaderboard_index_check',
+        name='Verify leaderboard index',
+        replace_existing=True
+    )
+
+    # Pick up token revocations made by other worker processes
+    scheduler.add_job(
+        load_token_versions,
+        trigger=IntervalTrigger(minutes=TOKEN_VERSION_REFRESH_MINUTES),
+        id='token_version_refresh',
+        name='Refresh token versions',
+        replace_existing=True
+    )
+
+    # Drop dashboard sync tombstones past their retention
+    scheduler.add_job(
+        prune_tombstones,
+        trigger=CronTrigger(hour=3, minute=0),
+        id='sync_tombstone_prune',
+        name='Prune sync tombstones',
+        replace_existing=True
+    )
     
     scheduler.start()
     print("[Scheduler] Started. Weekly leaderboard will reset every Monday at 00:00 UTC.")
@@ -0,0 +1,82 @@
+"""
+Delta sync support for GET /dashboard/changes.
+
+Meals, meal items, workouts and workout sets carry an updated_at column, and
+deletions leave a row in sync_tombstones. A sync cursor is an opaque
+timestamp: the changes endpoint returns everything updated or deleted after
+it, plus the cursor for the next call.
+
+Timestamps come from now(), i.e. the start of the writing transaction, so a
+transaction that started before a cursor was issued can commit after it. Each
+issued cursor is therefore moved back by SYNC_CURSOR_OVERLAP_SECONDS; clients
+may see a row twice and must apply changes as upserts.
+"""
+
+import base64
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from db.session import SessionLocal
+from models.sync import SyncTombstone
+
+SYNC_CURSOR_OVERLAP_SECONDS = float(os.getenv("SYNC_CURSOR_OVERLAP_SECONDS", "5"))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+TOMBSTONE_ENTITIES = ("meal", "meal_item", "workout", "workout_set")
+
+
+def record_deletions(db: Session, user_id: int, entity: str, ids: Iterable[int]):
+    """
+    Add tombstones for deleted rows, in the caller's transaction.
+    """
+    rows = [{"user_id": user_id, "entity": entity, "entity_id": entity_id} for entity_id in ids]
+    if rows:
+        db.execute(insert(SyncTombstone), rows)
+
+
+def issue_cursor(db: Session) -> str:
+    """
+    Cursor covering everything committed before this transaction started
+    (less the overlap margin).
+    """
+    now = db.execute(select(func.now())).scalar_one()
+    position = now - timedelta(seconds=SYNC_CURSOR_OVERLAP_SECONDS)
+    return base64.urlsafe_b64encode(position.isoformat().encode()).decode()
+
+
+def decode_cursor(cursor: str) -> datetime:
+    """
+    The cursor's timestamp. 400 if malformed, 410 if older than the tombstone
+    retention (the client must reload the full dashboard).
+    """
+    try:
+        since = datetime.fromisoformat(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if since < datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS):
+        raise HTTPException(status_code=410, detail="Sync cursor expired; reload the dashboard")
+    return since
+
+
+def prune_tombstones():
+    """
+    Delete tombstones past the retention window (scheduled daily).
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        result = db.execute(delete(SyncTombstone).where(SyncTombstone.deleted_at < cutoff))
+        db.commit()
+        print(f"[{datetime.now(timezone.utc)}] Pruned {result.rowcount} sync tombstones")
+    except Exception as e:
+        db.rollback()
+        print(f"[{datetime.now(timezone.utc)}] Tombstone prune failed: {e}")
+    finally:
+        db.close()
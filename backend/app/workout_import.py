@@ -0,0 +1,327 @@
+"""
+Bulk import of workout history from other apps' CSV exports (Strong, Hevy).
+
+Both exports have one row per set, with the workout's start time repeated on
+every row. The file is read row by row and workouts are written in chunks of
+IMPORT_CHUNK_WORKOUTS, one transaction per chunk:
+- exercise names of the whole chunk are resolved together
+  (app.exercise_lookup);
+- workouts and sets are inserted with one executemany each;
+- the daily volume rollup is updated with one upsert.
+
+Workouts whose start time already exists for the user are skipped, so a file
+can be uploaded again after a failed or partial import.
+"""
+
+import csv
+import io
+import math
+import os
+from datetime import datetime, timezone
+from itertools import chain
+from typing import BinaryIO, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from models.exercise import Workout, WorkoutSet, normalize_exercise_name
+from app.daily_stats import add_sets_volume
+from app.exercise_lookup import resolve_exercise_ids
+
+IMPORT_CHUNK_WORKOUTS = int(os.getenv("IMPORT_CHUNK_WORKOUTS", "200"))
+IMPORT_MAX_ERRORS = 20
+LB_TO_KG = 0.45359237
+
+# Column limits: workout_sets.reps/duration_seconds are Integer, weight is
+# Numeric(6, 2) (kg), and a set's reps * weight goes into the Numeric(12, 2)
+# tonnage of user_daily_stats
+MAX_INT = 2**31 - 1
+MAX_WEIGHT_KG = 10000
+MAX_SET_TONNAGE = 10**10
+
+_DATETIME_FORMATS = ("%d %b %Y, %H:%M", "%d %b %Y %H:%M", "%Y-%m-%d %H:%M")
+
+
+class CsvFormat(NamedTuple):
+    start: str
+    title: str
+    exercise: str
+    set_no: str
+    reps: str
+    seconds: str
+    notes: str
+    # (column, factor to kg); the first one present in the header is used
+    weights: tuple[tuple[str, Optional[float]], ...]
+
+
+# Factor None: unit given by the weight_unit parameter
+CSV_FORMATS = {
+    "strong": CsvFormat(
+        start="Date",
+        title="Workout Name",
+        exercise="Exercise Name",
+        set_no="Set Order",
+        reps="Reps",
+        seconds="Seconds",
+        notes="Workout Notes",
+        weights=(("Weight", None),),
+    ),
+    "hevy": CsvFormat(
+        start="start_time",
+        title="title",
+        exercise="exercise_title",
+        set_no="set_index",
+        reps="reps",
+        seconds="duration_seconds",
+        notes="description",
+        weights=(("weight_kg", 1.0), ("weight_lbs", LB_TO_KG)),
+    ),
+}
+
+
+class _ParsedSet(NamedTuple):
+    exercise_name: str
+    reps: Optional[int]
+    weight: Optional[float]
+    duration_seconds: Optional[int]
+
+
+class _PendingWorkout(NamedTuple):
+    performed_at: datetime
+    notes: Optional[str]
+    sets: list
+
+
+def _detect_format(header: list[str]) -> tuple[str, CsvFormat, dict[str, int]]:
+    columns = {name.strip(): i for i, name in enumerate(header)}
+    for name, fmt in CSV_FORMATS.items():
+        if {fmt.start, fmt.exercise, fmt.set_no} <= columns.keys():
+            return name, fmt, columns
+    raise HTTPException(
+        status_code=400,
+        detail="Unrecognized CSV format (expected a Strong or Hevy workout export)",
+    )
+
+
+def _parse_datetime(value: str) -> datetime:
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        for fmt in _DATETIME_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"unrecognized date {value!r}")
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+
+
+def _parse_number(value: str) -> Optional[float]:
+    value = value.strip()
+    if not value:
+        return None
+    if "," in value and "." not in value:
+        # Decimal comma (semicolon-separated exports)
+        value = value.replace(",", ".")
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"not a finite number: {value!r}")
+    return number
+
+
+def _parse_count(value: str, column: str) -> Optional[int]:
+    number = _parse_number(value)
+    if number is None:
+        return None
+    if not 0 <= number <= MAX_INT:
+        raise ValueError(f"{column} out of range: {value.strip()!r}")
+    return int(number)
+
+
+def _get(row: list[str], columns: dict[str, int], name: str) -> str:
+    i = columns.get(name)
+    return row[i] if i is not None and i < len(row) else ""
+
+
+def _parse_row(row, fmt: CsvFormat, columns: dict[str, int], weight_factor: float):
+    """
+    (workout key, start time, notes, set) for one CSV row, or None for rows
+    that are not sets (rest timers, empty sets). ValueError if malformed or
+    out of range for the workout_sets columns.
+    """
+    name = _get(row, columns, fmt.exercise).strip()
+    set_no_raw = _get(row, columns, fmt.set_no).strip()
+    if not name or "rest" in set_no_raw.lower():
+        return None
+
+    performed_at = _parse_datetime(_get(row, columns, fmt.start))
+    title = _get(row, columns, fmt.title).strip()
+    description = _get(row, columns, fmt.notes).strip()
+    notes = "\n".join(part for part in (title, description) if part) or None
+
+    reps = _parse_count(_get(row, columns, fmt.reps), fmt.reps)
+    seconds = _parse_count(_get(row, columns, fmt.seconds), fmt.seconds)
+    weight = None
+    for column, factor in fmt.weights:
+        if column in columns:
+            weight = _parse_number(_get(row, columns, column))
+            if weight is not None:
+                weight = round(weight * (factor or weight_factor), 2)
+                if abs(weight) >= MAX_WEIGHT_KG:
+                    raise ValueError(f"{column} out of range: {weight} kg")
+            break
+    if reps is None and weight is None and not seconds:
+        return None
+    if reps and weight and abs(reps * weight) >= MAX_SET_TONNAGE:
+        raise ValueError(f"{fmt.reps} x weight out of range: {reps} x {weight} kg")
+
+    parsed_set = _ParsedSet(
+        exercise_name=name,
+        reps=reps,
+        weight=weight,
+        duration_seconds=seconds or None,
+    )
+    return (performed_at, title), performed_at, notes, parsed_set
+
+
+def _flush_chunk(
+    db: Session,
+    user_id: int,
+    chunk: dict,
+    written: dict,
+    exercise_ids: dict[str, int],
+    stats: dict,
+):
+    """
+    Write one chunk of parsed workouts in a single transaction.
+    `written` maps workout keys already handled to their workout id (None if
+    the workout existed before this import and is skipped).
+    """
+    new_keys = [key for key in chunk if key not in written]
+    if new_keys:
+        existing = set(
+            db.execute(
+                select(Workout.performed_at).where(
+                    Workout.user_id == user_id,
+                    Workout.performed_at.in_({chunk[key].performed_at for key in new_keys}),
+                )
+            ).scalars()
+        )
+        for key in new_keys:
+            if chunk[key].performed_at in existing:
+                written[key] = None
+                stats["workouts_skipped"] += 1
+        new_keys = [key for key in new_keys if key not in written]
+
+    if new_keys:
+        workout_ids = db.execute(
+            insert(Workout.__table__).returning(Workout.id, sort_by_parameter_order=True),
+            [
+                {"user_id": user_id, "performed_at": chunk[key].performed_at, "notes": chunk[key].notes}
+                for key in new_keys
+            ],
+        ).scalars().all()
+        written.update(zip(new_keys, workout_ids))
+        stats["workouts_imported"] += len(new_keys)
+
+    names = {
+        s.exercise_name
+        for key, pending in chunk.items()
+        if written[key] is not None
+        for s in pending.sets
+    }
+    stats["exercises_created"] += resolve_exercise_ids(db, names, exercise_ids)
+
+    set_rows = []
+    for key, pending in chunk.items():
+        workout_id = written[key]
+        if workout_id is None:
+            continue
+        # Sets are numbered by their position within the exercise, in file
+        # order: the exports' own set orders mix numbers with Strong's
+        # "W"arm-up/"D"rop/"F"ailure markers, which would give duplicates
+        positions: dict[int, int] = {}
+        for s in pending.sets:
+            exercise_id = exercise_ids[normalize_exercise_name(s.exercise_name)]
+            positions[exercise_id] = positions.get(exercise_id, 0) + 1
+            set_rows.append({
+                "workout_id": workout_id,
+                "exercise_id": exercise_id,
+                "set_no": positions[exercise_id],
+                "reps": s.reps,
+                "weight": s.weight,
+                "duration_seconds": s.duration_seconds,
+            })
+    if set_rows:
+        # Core insert: the ORM bulk path would split the batch wherever a row's
+        # None columns differ from the previous row's
+        set_ids = db.execute(insert(WorkoutSet.__table__).returning(WorkoutSet.id), set_rows).scalars().all()
+        add_sets_volume(db, set_ids)
+        stats["sets_imported"] += len(set_rows)
+
+    db.commit()
+    chunk.clear()
+
+
+def import_workouts(db: Session, user_id: int, data: BinaryIO, weight_unit: str = "kg") -> dict:
+    """
+    Import a Strong/Hevy CSV export for `user_id`. `weight_unit` ("kg" or
+    "lb") applies to exports whose weight column has no unit (Strong).
+    Returns counters plus the first IMPORT_MAX_ERRORS row errors.
+    """
+    text = io.TextIOWrapper(data, encoding="utf-8-sig", newline="")
+    first_line = text.readline()
+    if not first_line.strip():
+        raise HTTPException(status_code=400, detail="Empty CSV")
+    # Strong uses ";" when the locale has decimal commas
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    reader = csv.reader(chain([first_line], text), delimiter=delimiter)
+    format_name, fmt, columns = _detect_format(next(reader))
+    weight_factor = LB_TO_KG if weight_unit == "lb" else 1.0
+
+    stats = {
+        "format": format_name,
+        "workouts_imported": 0,
+        "workouts_skipped": 0,
+        "sets_imported": 0,
+        "rows_skipped": 0,
+        "exercises_created": 0,
+        "errors": [],
+    }
+    chunk: dict = {}
+    written: dict = {}
+    exercise_ids: dict[str, int] = {}  # normalized name -> id
+    try:
+        for line_no, row in enumerate(reader, start=2):
+            if not any(field.strip() for field in row):
+                continue
+            try:
+                parsed = _parse_row(row, fmt, columns, weight_factor)
+            except (ValueError, OverflowError) as e:
+                stats["rows_skipped"] += 1
+                if len(stats["errors"]) < IMPORT_MAX_ERRORS:
+                    stats["errors"].append(f"line {line_no}: {e}")
+                continue
+            if parsed is None:
+                stats["rows_skipped"] += 1
+                continue
+
+            key, performed_at, notes, parsed_set = parsed
+            pending = chunk.get(key)
+            if pending is None:
+                if len(chunk) >= IMPORT_CHUNK_WORKOUTS:
+                    _flush_chunk(db, user_id, chunk, written, exercise_ids, stats)
+                pending = chunk[key] = _PendingWorkout(performed_at, notes, [])
+            pending.sets.append(parsed_set)
+
+        _flush_chunk(db, user_id, chunk, written, exercise_ids, stats)
+    except csv.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Malformed CSV: {e}")
+    finally:
+        text.detach()
+    return stats
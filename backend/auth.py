@@ -1,16 +1,23 @@
-from datetime import datetime, timedelta
-from typing import Optional
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, update
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 import os
 from dotenv import load_dotenv
 from urllib.parse import urlparse, parse_qsl
 
+from app.cache import TTLCache
+from db.database import get_db
+
 load_dotenv()
 
 tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
@@ -30,6 +37,11 @@ DATABASES = {
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("ACCESS_TOKEN_EXPIRE_HOURS", "24"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Hash/verify calls allowed to be running or queued before requests get a 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -49,6 +61,61 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(truncated_password, hashed)
 
 
+_password_pool: Optional[ProcessPoolExecutor] = None
+_password_pending = 0
+
+
+def _get_password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    if _password_pool is None:
+        # forkserver: workers are not forked from a process that already runs
+        # the scheduler/threadpool threads
+        _password_pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _password_pool
+
+
+async def _run_in_password_pool(func, *args):
+    """
+    Run a bcrypt call in the password process pool, off the event loop and the
+    request threadpool. Raises 503 once PASSWORD_HASH_MAX_PENDING calls are
+    already waiting, instead of queueing without bound.
+
+    Only called from the event loop, so the pending counter needs no lock.
+    """
+    global _password_pending
+    if _password_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in requests, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_password_pool(), func, *args)
+    finally:
+        _password_pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_password_pool(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_in_password_pool(verify_password, plain, hashed)
+
+
+def shutdown_password_pool():
+    global _password_pool
+    if _password_pool is not None:
+        _password_pool.shutdown(wait=False, cancel_futures=True)
+        _password_pool = None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (
@@ -67,47 +134,168 @@ def decode_access_token(token: str):
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Token subject (user id) -> the user's column values
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme)
-):
-    from db.session import SessionLocal
+
+def invalidate_cached_user(user_id: int):
+    """
+    Drop a user's cached snapshot. Call after committing changes to their row.
+    """
+    user_cache.invalidate(user_id)
+
+
+def _user_from_snapshot(values: dict):
+    """
+    Build a fresh detached User from cached column values, so every request
+    gets its own instance to merge into its session.
+    """
     from models.user import User
-    payload = decode_access_token(token)
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
 
+
+def _credentials_error(detail: str = "Invalid authentication credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _decode_subject(token: str) -> tuple[int, dict]:
+    """
+    Verify the token and return (user id, claims), or raise 401.
+    """
+    payload = decode_access_token(token)
     if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
 
     user_id_str = payload.get("sub")
     if user_id_str is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
 
     try:
         user_id = int(user_id_str)
     except (ValueError, TypeError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+        raise _credentials_error()
+
+    return user_id, payload
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
+    """
+    The token's user, attached to the request's session (the same get_db
+    session the route receives), so routes can modify and commit it directly.
+    """
+    from models.user import User
+    user_id, payload = _decode_subject(token)
+
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        # Attach without a SELECT
+        user = db.merge(_user_from_snapshot(snapshot), load=False)
+    else:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            raise _credentials_error("User not found")
+        user_cache.set(
+            user_id,
+            {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs},
         )
 
+    if payload.get("tv", 0) != (user.token_version or 0):
+        raise _credentials_error("Token has been revoked")
+    return user
+
+
+# ===================== TOKEN PRINCIPAL (NO QUERY) =====================
+
+class TokenPrincipal(NamedTuple):
+    id: int
+    username: str
+
+
+# user id -> token_version, for users who have revoked their tokens at least
+# once (everybody else is at 0). Loaded at startup, refreshed by the scheduler
+# (for revocations made by other workers) and updated in place by
+# revoke_user_tokens().
+_token_versions: dict[int, int] = {}
+
+
+def create_user_access_token(user) -> str:
+    """
+    Access token carrying the claims get_token_principal() needs: the user id
+    (sub), username and token version (tv).
+    """
+    return create_access_token(
+        data={
+            "sub": str(user.id),
+            "username": user.username,
+            "tv": user.token_version or 0,
+        }
+    )
+
+
+def load_token_versions():
+    """
+    (Re)load the token version map from the users table.
+    """
+    global _token_versions
+    from db.database import SessionLocal
+    from models.user import User
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return user
+        rows = db.query(User.id, User.token_version).filter(User.token_version > 0).all()
+        _token_versions = {row.id: row.token_version for row in rows}
+    except Exception as e:
+        print(f"[{datetime.now(timezone.utc)}] ERROR loading token versions: {e}")
     finally:
         db.close()
+
+
+def revoke_user_tokens(db: Session, user_id: int) -> int:
+    """
+    Invalidate every token issued to the user so far by bumping their
+    token_version. Returns the new version.
+    """
+    from models.user import User
+    version = db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+    ).scalar_one()
+    db.commit()
+
+    _token_versions[user_id] = version
+    invalidate_cached_user(user_id)
+    return version
+
+
+def get_token_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> TokenPrincipal:
+    """
+    Lightweight auth for read-only routes that only need the user's id and
+    username: trusts the signed claims and checks the token version against
+    the in-memory map, without querying the database.
+
+    Tokens issued before the claims existed (no username) fall back to
+    get_current_user().
+    """
+    user_id, payload = _decode_subject(token)
+
+    username = payload.get("username")
+    if username is None:
+        user = get_current_user(token, db)
+        return TokenPrincipal(user.id, user.username)
+
+    if payload.get("tv", 0) != _token_versions.get(user_id, 0):
+        raise _credentials_error("Token has been revoked")
+    return TokenPrincipal(user_id, username)
@@ -3,6 +3,9 @@ from .meal import Food, Meal, MealItem
 from .exercise import Exercise, Workout, WorkoutSet
 from .challenge import Challenge, UserChallenge
 from .questionnaire import QuestionnaireQuestion, UserQuestionnaireAnswer
+from .leaderboard import UserWeeklyXP, LeaderboardSnapshot
+from .daily_stats import UserDailyStats
+from .sync import SyncTombstone
 from app.scheduler import LeaderboardReset
 
 __all__ = [
@@ -11,5 +14,8 @@ __all__ = [
     "Exercise", "Workout", "WorkoutSet",
     "Challenge", "UserChallenge",
     "QuestionnaireQuestion", "UserQuestionnaireAnswer",
+    "UserWeeklyXP", "LeaderboardSnapshot",
+    "UserDailyStats",
+    "SyncTombstone",
     "LeaderboardReset",
 ]
@@ -0,0 +1,34 @@
+# backend/models/daily_stats.py
+from sqlalchemy import Column, Integer, Date, DateTime, Numeric, ForeignKey
+from sqlalchemy.sql import func
+
+from db.base import Base
+
+
+class UserDailyStats(Base):
+    """
+    Per-user daily rollup of nutrition and training volume: one row per
+    (user, UTC day) with anything logged.
+
+    Maintained by app.daily_stats when meals/workouts are written, and rebuilt
+    from the raw tables by rebuild_daily_stats.py.
+    """
+    __tablename__ = "user_daily_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    # Nutrition (sum over the day's meal items: qty grams * per-100g values)
+    calories = Column(Numeric(10, 2), nullable=False, default=0)
+    protein = Column(Numeric(10, 2), nullable=False, default=0)
+    carbs = Column(Numeric(10, 2), nullable=False, default=0)
+    fats = Column(Numeric(10, 2), nullable=False, default=0)
+
+    # Training volume (sum over the day's workout sets)
+    sets = Column(Integer, nullable=False, default=0)
+    reps = Column(Integer, nullable=False, default=0)
+    tonnage = Column(Numeric(12, 2), nullable=False, default=0)  # kg, reps * weight
+
+    updated_at = Column(DateTime(timezone=True),
+                        server_default=func.now(),
+                        onupdate=func.now())
@@ -15,12 +15,26 @@ from sqlalchemy.orm import relationship
 from db.base import Base
 
 
+def normalize_exercise_name(name: str) -> str:
+    """
+    Lookup key for exercise names: whitespace collapsed, case-folded.
+    """
+    return " ".join(name.split()).casefold()
+
+
+def _normalized_name_default(context):
+    return normalize_exercise_name(context.get_current_parameters()["name"])
+
+
 class Exercise(Base):
     __tablename__ = "exercises"
     __table_args__ = (UniqueConstraint("name", name="uq_exercises_name"),)
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
+    # normalize_exercise_name(name), filled on insert; workouts and imports
+    # resolve names against it
+    name_normalized = Column(String, nullable=True, index=True, default=_normalized_name_default)
     # can enum later
     type = Column(String, nullable=False)
     muscle_group = Column(String, nullable=False)
@@ -55,12 +69,15 @@ class Workout(Base):
     __tablename__ = "workouts"
     __table_args__ = (
         Index("ix_workouts_user_performedat", "user_id", "performed_at"),
+        Index("ix_workouts_user_updated_at", "user_id", "updated_at"),
     )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     performed_at = Column(DateTime(timezone=True), nullable=False)
     notes = Column(String)
+    # Change tracking for GET /dashboard/changes
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     user = relationship("User", back_populates="workouts")
     sets = relationship(
@@ -74,6 +91,7 @@ class WorkoutSet(Base):
     __tablename__ = "workout_sets"
     __table_args__ = (
         Index("ix_workout_sets_workout_id", "workout_id"),
+        Index("ix_workout_sets_updated_at", "updated_at"),
     )
 
     id = Column(Integer, primary_key=True)
@@ -84,6 +102,7 @@ class WorkoutSet(Base):
     weight = Column(Numeric(6, 2))           # kg
     duration_seconds = Column(Integer)       # optional
     calories = Column(Numeric(8, 2))         # optional
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     workout = relationship("Workout", back_populates="sets")
     exercise = relationship("Exercise", back_populates="sets")
@@ -1,19 +1,45 @@
 # backend/models/leaderboard.py
-from sqlalchemy import Column, Integer, Date, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime, Index, desc
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
 from db.base import Base
 
 
-class LeaderboardEntry(Base):
-    __tablename__ = "leaderboard_entries"
+class UserWeeklyXP(Base):
+    """
+    Weekly XP ledger: one row per (user, leaderboard week) the user earned XP in.
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
-    weekly_points = Column(Integer, nullable=False, default=0)
+    week_start is the Monday (UTC) of the week. The weekly reset does not touch
+    this table; a new week simply starts writing under a new key, and earlier
+    weeks stay as history. Users without a row for the current week have 0 XP.
+    """
+    __tablename__ = "user_weekly_xp"
+    __table_args__ = (
+        # Current week's standings: (week_start, xp DESC, user_id) matches the leaderboard order
+        Index("ix_user_weekly_xp_week_xp_desc_user", "week_start", desc("xp"), "user_id"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    xp = Column(Integer, nullable=False, default=0)
     updated_at = Column(DateTime(timezone=True),
                         server_default=func.now(),
                         onupdate=func.now())
 
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+
+class LeaderboardSnapshot(Base):
+    """
+    Final standings of a finished leaderboard week, copied from user_weekly_xp
+    when the week rolls over. Only users who earned XP are archived; past-week
+    views page through this table by rank and never touch users.
+    """
+    __tablename__ = "leaderboard_snapshots"
+
+    week_start = Column(Date, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    username = Column(String, nullable=False)
+    weekly_xp = Column(Integer, nullable=False)
@@ -23,12 +23,15 @@ class Meal(Base):
     __tablename__ = "meals"
     __table_args__ = (
         Index("ix_meals_user_eatenat_desc", "user_id", "eaten_at"),
+        Index("ix_meals_user_updated_at", "user_id", "updated_at"),
     )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     eaten_at = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Change tracking for GET /dashboard/changes
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     user = relationship("User", back_populates="meals")
     items = relationship("MealItem", back_populates="meal", cascade="all, delete-orphan")
@@ -37,6 +40,7 @@ class MealItem(Base):
     __tablename__ = "meal_items"
     __table_args__ = (
         Index("ix_meal_items_meal_id", "meal_id"),
+        Index("ix_meal_items_updated_at", "updated_at"),
     )
 
     id = Column(Integer, primary_key=True)
@@ -44,6 +48,7 @@ class MealItem(Base):
     food_id = Column(Integer, ForeignKey("foods.id"), nullable=False)
     qty = Column(Numeric(8, 2), nullable=False)
     meal_label = Column(String, default="other")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
 
     meal = relationship("Meal", back_populates="items")
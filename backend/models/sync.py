@@ -0,0 +1,24 @@
+# backend/models/sync.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from db.base import Base
+
+
+class SyncTombstone(Base):
+    """
+    Record of a deleted meal / meal item / workout / workout set, so
+    GET /dashboard/changes can tell clients to drop it.
+
+    Kept for SYNC_TOMBSTONE_RETENTION_DAYS; older sync cursors are rejected.
+    """
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_deleted_at", "user_id", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String, nullable=False)  # "meal", "meal_item", "workout", "workout_set"
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
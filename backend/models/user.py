@@ -17,8 +17,13 @@ class User(Base):
     last_challenge_completed_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    # Legacy: weekly XP now lives in user_weekly_xp (keyed by week); values
+    # left from before are moved there on startup and the column is zeroed.
+    # Kept so existing rows/inserts stay valid.
     weekly_xp = Column(Integer, default=0, nullable=False)
     total_xp = Column(Integer, default=0, nullable=False)
+    # Bumped to revoke every token issued so far (JWT "tv" claim)
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     meals = relationship("Meal", back_populates="user", cascade="all, delete-orphan")
     workouts = relationship("Workout", back_populates="user", cascade="all, delete-orphan")
@@ -0,0 +1,26 @@
+import argparse
+
+from db.session import SessionLocal
+
+from models import *
+from app.daily_stats import rebuild_daily_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild user_daily_stats from meals and workouts.")
+    parser.add_argument("--user-id", type=int, help="Only rebuild this user's rows")
+    args = parser.parse_args()
+
+    target = f"user {args.user_id}" if args.user_id is not None else "all users"
+    print(f"Rebuilding daily stats for {target}...")
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_stats(db, args.user_id)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Done. {rows} rows written.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from datetime import date
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 class LeaderboardItem(BaseModel):
@@ -6,14 +9,44 @@ class LeaderboardItem(BaseModel):
     rank: int
 
 
+class LeaderboardPage(BaseModel):
+    items: List[LeaderboardItem]
+    # Opaque keyset cursor for the next page (null on the last page)
+    next_cursor: Optional[str] = None
+
 
 class LeaderboardSummary(BaseModel):
     # Rank in the weekly leaderboard (can be null if user not on board yet)
     rank: int | None
-    # From users.weekly_xp
+    # This week's XP (user_weekly_xp)
     weekly_xp: int
-    # From leaderboard_entries.weekly_points (for consistency / debugging)
+    # Mirrors weekly_xp (for consistency / debugging)
     weekly_points: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class XPHistogramBucket(BaseModel):
+    # Inclusive weekly XP range of the bucket
+    min_xp: int
+    max_xp: int
+    count: int
+
+
+class XPQuantileCutoffs(BaseModel):
+    # Weekly XP needed to be in the top 1% / 10% / 50% of users
+    top_1_percent: int
+    top_10_percent: int
+    top_50_percent: int
+
+
+class LeaderboardStats(BaseModel):
+    week_start: date
+    total_users: int
+    weekly_xp: int
+    rank: int
+    # Share of users with less weekly XP than the current user (0-100)
+    percentile: float
+    cutoffs: XPQuantileCutoffs
+    histogram: List[XPHistogramBucket]
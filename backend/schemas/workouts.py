@@ -25,3 +25,14 @@ class WorkoutCreate(BaseModel):
 class WorkoutCreateResponse(BaseModel):
     status: str
     workout_id: int
+
+
+class WorkoutImportResponse(BaseModel):
+    status: str
+    format: str
+    workouts_imported: int
+    workouts_skipped: int  # already present (same start time)
+    sets_imported: int
+    rows_skipped: int      # not a set (rest timers, empty rows) or malformed
+    exercises_created: int
+    errors: List[str]      # first malformed rows, "line N: reason"
@@ -1,4 +1,4 @@
-import { useMemo, useState } from "react";
+import { useEffect, useMemo, useState } from "react";
 
 type FoodItem = {
   foodName: string;
@@ -44,6 +44,8 @@ type CalendarProps = {
   mealDates?: string[];
   meals?: Meal[];
   workouts?: Workout[];
+  // Called with the first day of the displayed month (local time)
+  onMonthChange?: (monthStart: Date) => void;
 };
 
 /**
@@ -82,6 +84,7 @@ function Calendar({
   // mealDates = [],
   meals = [],
   workouts = [],
+  onMonthChange,
 }: CalendarProps) {
   const [currentDate, setCurrentDate] = useState(() => new Date());
 
@@ -93,6 +96,10 @@ function Calendar({
   const year = currentDate.getFullYear();
   const month = currentDate.getMonth();
 
+  useEffect(() => {
+    onMonthChange?.(new Date(year, month, 1));
+  }, [year, month, onMonthChange]);
+
   const days = useMemo(() => {
     const firstDayOfMonth = new Date(year, month, 1);
     const lastDayOfMonth = new Date(year, month + 1, 0);
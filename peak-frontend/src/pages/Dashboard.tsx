@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useCallback, useEffect, useRef, useState } from "react";
 import { useSearchParams } from "react-router-dom";
 import api from "../api/axios";
 import Calendar from "../components/dashboard/calendar";
@@ -17,6 +17,45 @@ type CalendarApiResponse = {
   workoutDates: string[];
   meals: any[];
   workouts: any[];
+  nextCursor: string | null;
+  syncCursor: string;
+};
+
+type DashboardChanges = {
+  meals: any[];
+  workouts: any[];
+  deleted: {
+    meals: number[];
+    mealItems: number[];
+    workouts: number[];
+    workoutSets: number[];
+  };
+  nextCursor: string;
+};
+
+// Changed rows replace the ones with the same id; deleted ids are dropped
+const upsertById = (current: any[], changed: any[], deletedIds: number[]) => {
+  const replaced = new Set([...changed.map((row) => row.id), ...deletedIds]);
+  return [...changed, ...current.filter((row) => !replaced.has(row.id))];
+};
+
+const applyChanges = (
+  data: CalendarApiResponse,
+  changes: DashboardChanges
+): CalendarApiResponse => {
+  const deletedItems = new Set(changes.deleted.mealItems);
+  const deletedSets = new Set(changes.deleted.workoutSets);
+  return {
+    ...data,
+    meals: upsertById(data.meals, changes.meals, changes.deleted.meals).map(
+      (m) => ({ ...m, items: m.items.filter((i: any) => !deletedItems.has(i.id)) })
+    ),
+    workouts: upsertById(
+      data.workouts,
+      changes.workouts,
+      changes.deleted.workouts
+    ).map((w) => ({ ...w, sets: w.sets.filter((s: any) => !deletedSets.has(s.id)) })),
+  };
 };
 
 type CompleteResponse = {
@@ -36,11 +75,25 @@ export default function Dashboard() {
   const [hasTodayMealLog, setHasTodayMealLog] = useState<boolean | null>(null);
   const [calendarRefreshKey, setCalendarRefreshKey] = useState(0);
   const [searchParams, setSearchParams] = useSearchParams();
+  // Sync cursor of the loaded month, for fetching only changes after a save
+  const syncRef = useRef<{ cursor: string; month: number } | null>(null);
+  const [visibleMonth, setVisibleMonth] = useState(() => {
+    const now = new Date();
+    return new Date(now.getFullYear(), now.getMonth(), 1);
+  });
+
+  const handleMonthChange = useCallback((monthStart: Date) => {
+    setVisibleMonth((prev) =>
+      prev.getTime() === monthStart.getTime() ? prev : monthStart
+    );
+  }, []);
 
   useEffect(() => {
     const fetchCalendar = async () => {
       try {
-        setLoading(true);
+        // Only the first load replaces the calendar with the loading message,
+        // so switching months keeps the calendar mounted
+        if (!calendarData) setLoading(true);
 
         const headers: HeadersInit = {
           "Content-Type": "application/json",
@@ -49,19 +102,69 @@ export default function Dashboard() {
           headers.Authorization = `Bearer ${token}`;
         }
 
-        const res = await fetch(`${API_BASE_URL}/dashboard/`, {
-          method: "GET",
-          headers,
-          credentials: "include",
+        // Same month already loaded (a meal/workout was saved): apply just
+        // the changes since the last sync. An expired cursor (410) falls
+        // through to a full reload.
+        const synced = syncRef.current;
+        if (calendarData && synced && synced.month === visibleMonth.getTime()) {
+          const res = await fetch(
+            `${API_BASE_URL}/dashboard/changes?since=${encodeURIComponent(synced.cursor)}`,
+            { method: "GET", headers, credentials: "include" }
+          );
+          if (res.ok) {
+            const changes: DashboardChanges = await res.json();
+            setCalendarData((prev) => (prev ? applyChanges(prev, changes) : prev));
+            syncRef.current = { cursor: changes.nextCursor, month: synced.month };
+            return;
+          }
+          if (res.status !== 410) {
+            throw new Error(`Failed to sync calendar data (${res.status})`);
+          }
+        }
+
+        // Only the visible month, following nextCursor until every page is in
+        const monthEnd = new Date(
+          visibleMonth.getFullYear(),
+          visibleMonth.getMonth() + 1,
+          1
+        );
+        const params = new URLSearchParams({
+          from: visibleMonth.toISOString(),
+          to: monthEnd.toISOString(),
         });
 
-        if (!res.ok) {
-          throw new Error(`Failed to load calendar data (${res.status})`);
-        }
+        let data: CalendarApiResponse | null = null;
+        let cursor: string | null = null;
+        do {
+          if (cursor) params.set("cursor", cursor);
+          const res = await fetch(`${API_BASE_URL}/dashboard/?${params}`, {
+            method: "GET",
+            headers,
+            credentials: "include",
+          });
+
+          if (!res.ok) {
+            throw new Error(`Failed to load calendar data (${res.status})`);
+          }
+
+          const page: CalendarApiResponse = await res.json();
+          data = data
+            ? {
+                ...page,
+                meals: [...data.meals, ...page.meals],
+                workouts: [...data.workouts, ...page.workouts],
+                // The first page's cursor also covers writes made while paging
+                syncCursor: data.syncCursor,
+              }
+            : page;
+          cursor = page.nextCursor;
+        } while (cursor);
 
-        const data: CalendarApiResponse = await res.json();
         console.log("calendar data", data);
         setCalendarData(data);
+        if (data) {
+          syncRef.current = { cursor: data.syncCursor, month: visibleMonth.getTime() };
+        }
       } catch (err: any) {
         console.error(err);
         setError(
@@ -78,7 +181,7 @@ export default function Dashboard() {
       setLoading(false);
       setError("You must be logged in to view your dashboard.");
     }
-  }, [token, calendarRefreshKey]);
+  }, [token, calendarRefreshKey, visibleMonth]);
 
   useEffect(() => {
     const checkTodayMeal = async () => {
@@ -141,6 +244,7 @@ export default function Dashboard() {
                 mealDates={mealDates}
                 meals={calendarData.meals}
                 workouts={calendarData.workouts}
+                onMonthChange={handleMonthChange}
               />
 
               <div className="flex flex-col gap-30">
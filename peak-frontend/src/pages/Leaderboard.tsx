@@ -12,25 +12,71 @@ type LeaderboardEntry = {
 
 type MeEntry = LeaderboardEntry;
 
+type LeaderboardPage = {
+  items: LeaderboardEntry[];
+  next_cursor: string | null;
+};
+
+type RankChange = {
+  username: string;
+  weekly_xp: number;
+  previous_rank: number | null;
+  rank: number;
+  version: number;
+};
+
+const PAGE_SIZE = 50;
+
+// Users in [rank, previous_rank) move down one place when `change.username` moves up
+const shiftedRank = (entryRank: number, change: RankChange) =>
+  entryRank >= change.rank &&
+  (change.previous_rank === null || entryRank < change.previous_rank)
+    ? entryRank + 1
+    : entryRank;
+
+const applyRankChange = (
+  prev: LeaderboardEntry[],
+  change: RankChange
+): LeaderboardEntry[] => {
+  const others = prev
+    .filter((e) => e.username !== change.username)
+    .map((e) => ({ ...e, rank: shiftedRank(e.rank, change) }));
+  const lastLoadedRank = prev.length ? prev[prev.length - 1].rank : 0;
+  if (change.rank <= lastLoadedRank) {
+    others.push({
+      username: change.username,
+      weekly_points: change.weekly_xp,
+      rank: change.rank,
+    });
+  }
+  return others.sort((a, b) => a.rank - b.rank);
+};
+
+const authHeaders = (token: string | null): HeadersInit => ({
+  "Content-Type": "application/json",
+  ...(token ? { Authorization: `Bearer ${token}` } : {}),
+});
+
 export default function Leaderboard() {
   const { token } = useAuth();
 
   const [entries, setEntries] = useState<LeaderboardEntry[]>([]);
   const [me, setMe] = useState<MeEntry | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // Bumped by the live stream when the standings must be refetched
+  const [refreshKey, setRefreshKey] = useState(0);
 
   useEffect(() => {
     const fetchLeaderboard = async () => {
       try {
-        const headers: HeadersInit = {
-          "Content-Type": "application/json",
-          ...(token ? { Authorization: `Bearer ${token}` } : {}),
-        };
+        const headers = authHeaders(token);
 
-        // fetch weekly + me in parallel
+        // fetch first weekly page + me in parallel
         const [weeklyRes, meRes] = await Promise.all([
-          fetch(`${API_BASE_URL}/leaderboard/weekly`, {
+          fetch(`${API_BASE_URL}/leaderboard/weekly?limit=${PAGE_SIZE}`, {
             headers,
             credentials: "include",
           }),
@@ -47,10 +93,11 @@ export default function Leaderboard() {
           throw new Error(`Me request failed: ${meRes.status}`);
         }
 
-        const weeklyData: LeaderboardEntry[] = await weeklyRes.json();
+        const weeklyData: LeaderboardPage = await weeklyRes.json();
         const meData: MeEntry = await meRes.json();
 
-        setEntries(weeklyData);
+        setEntries(weeklyData.items);
+        setNextCursor(weeklyData.next_cursor);
         setMe(meData);
       } catch (err) {
         console.error(err);
@@ -61,7 +108,62 @@ export default function Leaderboard() {
     };
 
     fetchLeaderboard();
-  }, [token]);
+  }, [token, refreshKey]);
+
+  // Live updates: apply pushed rank changes, refetch on "resync"
+  useEffect(() => {
+    const source = new EventSource(`${API_BASE_URL}/leaderboard/stream`, {
+      withCredentials: true,
+    });
+    // Every (re)connect starts with a resync; the first one follows our own fetch
+    let connected = false;
+
+    source.addEventListener("resync", () => {
+      if (connected) {
+        setRefreshKey((key) => key + 1);
+      }
+      connected = true;
+    });
+
+    source.addEventListener("rank_change", (event) => {
+      const change: RankChange = JSON.parse((event as MessageEvent).data);
+      setEntries((prev) => applyRankChange(prev, change));
+      setMe((prev) => {
+        if (!prev) return prev;
+        if (prev.username === change.username) {
+          return { ...prev, rank: change.rank, weekly_points: change.weekly_xp };
+        }
+        return { ...prev, rank: shiftedRank(prev.rank, change) };
+      });
+    });
+
+    return () => source.close();
+  }, []);
+
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const params = new URLSearchParams({
+        limit: String(PAGE_SIZE),
+        cursor: nextCursor,
+      });
+      const res = await fetch(`${API_BASE_URL}/leaderboard/weekly?${params}`, {
+        headers: authHeaders(token),
+        credentials: "include",
+      });
+      if (!res.ok) {
+        throw new Error(`Weekly request failed: ${res.status}`);
+      }
+      const page: LeaderboardPage = await res.json();
+      setEntries((prev) => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const sorted: LeaderboardEntry[] = Array.isArray(entries)
     ? [...entries].sort((a, b) => a.rank - b.rank)
@@ -152,6 +254,16 @@ export default function Leaderboard() {
               </span>
             </div>
           ))}
+          {nextCursor && (
+            <button
+              type="button"
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="w-full rounded-2xl border border-slate-200 px-5 py-3 text-sm font-medium disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          )}
         </div>
       </section>
 